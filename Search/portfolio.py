@@ -0,0 +1,144 @@
+'''
+Portfolio search: race several SearchEngine configurations on the same
+problem in parallel processes.
+
+Which strategy and heuristic solve a problem fastest varies a lot from
+instance to instance. portfolio_search runs one quiet SearchEngine per
+configuration, each in its own process, returns the first acceptable
+result and terminates the other processes (with the worker processes
+of a parallel_astar configuration). A configuration is a tuple
+
+    (strategy, cycle_check, heur_fn)
+
+of the arguments of SearchEngine and SearchEngine.search (heur_fn None
+for no heuristic). With optimal = True only the configurations whose
+strategy finds optimal solutions (OPTIMAL_STRATEGIES, assuming unit cost
+actions for the breadth first strategies and an admissible heuristic for
+the others) are raced, so the first solution is an optimal one.
+
+The initial state, goal function and heuristics are sent to the worker
+processes, so where processes are spawned rather than forked (Windows,
+macOS) they must be picklable, i.e., defined at the top level of a
+module, and the calling script must be guarded by
+if __name__ == '__main__'.
+
+Example:
+
+    configurations = [('astar', 'full', heur_blocking),
+                      ('best_first', 'full', heur_blocking),
+                      ('breadth_first', 'full', None)]
+    (configuration, result) = portfolio_search(s0, rushhour_goal_fn, configurations, max_seconds = 30)
+    if result:
+        result.print_result()
+'''
+
+from search import *
+import multiprocessing
+import pickle
+import queue
+import signal
+
+#The strategies whose solutions are optimal
+OPTIMAL_STRATEGIES = ['breadth_first', 'astar', 'idastar', 'bidirectional',
+                      'external_breadth_first', 'breadth_first_heuristic',
+                      'anytime_astar', 'parallel_astar']
+
+#Seconds between two checks for worker processes that died
+_POLL = 0.1
+
+
+def portfolio_search(initState, goal_fn, configurations, optimal = False, max_seconds = None):
+    '''Race the configurations on the problem of initState and goal_fn,
+       each in its own process and with a budget of max_seconds seconds.
+       Return (configuration, SearchResult) of the first to find a
+       solution (an optimal one, if optimal is True) or to prove that
+       there is none, or (None, None) if every configuration runs out of
+       budget. Unless optimal is True, a solution found by a configuration
+       that then ran out of budget is accepted, although it may be
+       suboptimal. If none succeeds and a configuration failed with an error,
+       raise a RuntimeError from the error of the first to fail.'''
+    if optimal:
+        configurations = [c for c in configurations if c[0] in OPTIMAL_STRATEGIES]
+        if not configurations:
+            raise ValueError('None of the configurations finds optimal solutions')
+    results = multiprocessing.Queue()
+    #not daemonic, so parallel_astar configurations can start their own
+    #worker processes
+    processes = [multiprocessing.Process(target = _race, args = (i, initState, goal_fn, configurations[i], max_seconds, results))
+                 for i in range(len(configurations))]
+    for process in processes:
+        process.start()
+    try:
+        pending = set(range(len(processes)))
+        #(configuration, exception) of the first configuration to fail
+        failure = None
+        while pending:
+            try:
+                (i, result, path, error) = results.get(timeout = _POLL)
+            except queue.Empty:
+                #a process that died without a result will never send one
+                for j in list(pending):
+                    if not processes[j].is_alive() and processes[j].exitcode != 0:
+                        pending.discard(j)
+                continue
+            pending.discard(i)
+            if error is not None:
+                if failure is None:
+                    failure = (configurations[i], error)
+                continue
+            #a solution found before the budget ran out (e.g., the best
+            #one so far of anytime_astar) may be suboptimal
+            if result.budget_exhausted and (optimal or not result.solved):
+                continue
+            if result.solved:
+                #the path was sent without the parent chain
+                for k in range(1, len(path)):
+                    path[k].parent = path[k - 1]
+                result.state = path[-1]
+            return (configurations[i], result)
+        if failure is not None:
+            raise RuntimeError('Portfolio configuration {} failed: {}: {}'.format(failure[0], type(failure[1]).__name__, failure[1])) from failure[1]
+        return (None, None)
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+
+
+def _race(i, initState, goal_fn, configuration, max_seconds, results):
+    '''Run configuration number i and put (i, its SearchResult, its
+       solution path, None) on the results queue ((i, None, None, the
+       exception) on an error)'''
+    #terminate() then unwinds the racer, so a parallel_astar search stops
+    #its worker processes on the way out instead of leaving them orphaned
+    signal.signal(signal.SIGTERM, _stop_race)
+    try:
+        (strategy, cycle_check, heur_fn) = configuration
+        se = SearchEngine(strategy, cycle_check)
+        se.quiet_on()
+        se.set_budget(max_seconds = max_seconds)
+        if heur_fn is None:
+            result = se.solve(initState, goal_fn)
+        else:
+            result = se.solve(initState, goal_fn, heur_fn)
+        #don't pickle the parent chains, they may be deeper than the
+        #recursion limit
+        path = result.path
+        for state in path:
+            state.parent = None
+        result.state = None
+        result.best_node = None
+        results.put((i, result, path, None))
+    except Exception as e:
+        #an exception that can't be pickled would never reach the parent
+        try:
+            pickle.loads(pickle.dumps(e))
+        except Exception:
+            e = RuntimeError('{}: {}'.format(type(e).__name__, e))
+        results.put((i, None, None, e))
+
+
+def _stop_race(signum, frame):
+    '''SIGTERM handler of the racers'''
+    raise SystemExit(1)
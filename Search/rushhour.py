@@ -11,6 +11,7 @@ rushhour STATESPACE
 
 from search import *
 from random import randint
+from random import Random
 
 ##################################################
 # The search space class 'rushhour'             #
@@ -111,46 +112,454 @@ class vehicle:
         
         return [self.name, self.loc, self.length, self.is_horizontal, self.is_goal]
         
+class rushhour_problem:
+    '''
+    the static part of a rushhour instance: the board properties and, for
+    every vehicle, its name, length, orientation, goal flag and lane. It is
+    built once by make_init_state and shared by every state of the search,
+    so that a state only stores the tuple of its vehicles' positions.
+
+    A vehicle never leaves its lane (its row if horizontal, its column if
+    vertical), so its position is the offset of its front (loc) along the
+    lane, i.e., loc[0] for a horizontal and loc[1] for a vertical vehicle.
+    Cell (x, y) is numbered y*n + x so that any set of cells is a single
+    int bitmask, and for every vehicle i and position p we precompute
+        masks[i][p] = the cells occupied by the vehicle
+        moves[i][p] = its forward and backward moves as (new position,
+                      bit of the cell entered, bit of the cell vacated,
+                      zobrist delta, action name)
+    A move is legal iff occupied & entered == 0, and the occupancy after
+    the move is occupied ^ entered ^ vacated.
+
+    zobrist[i][p] is a random 64-bit key for vehicle i at position p; the
+    zobrist hash of a state is the XOR of the keys of its vehicles, so a
+    move updates it by XOR-ing in its zobrist delta zobrist[i][p] ^
+    zobrist[i][new position].
+
+    If canonical is True, non-goal vehicles of the same length in the same
+    lane are interchangeable: states that differ only by which of them is
+    where are the same state for solving. Each group of them shares one
+    row of zobrist keys (so the XOR of their keys doesn't depend on which
+    is where) and rushhour.hashable_state() sorts their positions, so the
+    search merges these states. The states themselves keep the actual
+    positions, so paths are still printed with the original names.
+
+    If prune_moves is True (the default, set it to False to validate
+    against the unpruned search) rushhour.successors() skips two kinds of
+    redundant moves, given the move that generated the state:
+      - the inverse of that move, which just goes back to the parent, and
+      - a move of a vehicle with a smaller index than the last moved one
+        that commutes with the last move (i.e., doesn't enter the cell it
+        vacated): the same state is reached at the same cost by making
+        the two moves in the other order, which is not pruned.
+    So of every sequence of commuting moves only the one moving vehicles
+    in increasing index order is generated. Every optimal solution cost is
+    still found, whichever cheapest path to a state a search keeps (astar
+    and the other searches of SearchEngine.searchOpen keep all of them,
+    anytime_astar, parallel_astar, breadth_first_heuristic and
+    bidirectional search only the first one found). An inverse move is
+    never on a cheapest path. If the move from X to Y is pruned because it
+    commutes with the last move l of the path kept to X, Y is also reached
+    by l from the state Z where that move is made before l. Z is as far
+    from the start as X. If the path kept to Z prunes l in turn, its last
+    move has a larger vehicle index than l, so this ends at a predecessor
+    of Y at the same distance whose move to Y isn't pruned.
+
+    slide_metric is the cost of an action of rushhour_slides states, which
+    slide a vehicle any number of cells: 'distance' (the number of cells,
+    the default) or 'moves' (1 per slide).
+    '''
+
+    zobrist_seed = 0
+
+    def __init__(self, vehicle_list, board_properties, canonical = False, prune_moves = True):
+        (m, n) = board_properties[0]
+        self.board_properties = board_properties
+        self.prune_moves = prune_moves
+        self.slide_metric = 'distance'
+        self.names = tuple(vs[0] for vs in vehicle_list)
+        self.lengths = tuple(vs[2] for vs in vehicle_list)
+        self.is_horizontal = tuple(vs[3] for vs in vehicle_list)
+        self.is_goal = tuple(vs[4] for vs in vehicle_list)
+        self.lanes = tuple(vs[1][1] if vs[3] else vs[1][0] for vs in vehicle_list)
+        self.lane_sizes = tuple(n if vs[3] else m for vs in vehicle_list)
+        self.max_lane_size = max(m, n)
+        rand = Random(rushhour_problem.zobrist_seed)
+        self.zobrist = [[rand.getrandbits(64) for p in range(size)] for size in self.lane_sizes]
+        self.interchangeable = ()
+        if canonical:
+            groups = {}
+            for i in range(len(vehicle_list)):
+                if not self.is_goal[i]:
+                    key = (self.is_horizontal[i], self.lanes[i], self.lengths[i])
+                    groups.setdefault(key, []).append(i)
+            self.interchangeable = tuple(tuple(group) for group in groups.values() if len(group) > 1)
+            for group in self.interchangeable:
+                for i in group[1:]:
+                    self.zobrist[i] = self.zobrist[group[0]]
+        self.lane_cells = []
+        self.lane_masks = []
+        self.directions = []
+        self.masks = []
+        self.moves = []
+        for i in range(len(vehicle_list)):
+            length = self.lengths[i]
+            size = self.lane_sizes[i]
+            if self.is_horizontal[i]:
+                cells = [self.lanes[i] * n + x for x in range(n)]
+                directions = ('W', 'E')
+            else:
+                cells = [y * n + self.lanes[i] for y in range(m)]
+                directions = ('N', 'S')
+            self.lane_cells.append(cells)
+            lane = 0
+            for cell in cells:
+                lane |= 1 << cell
+            self.lane_masks.append(lane)
+            self.directions.append(directions)
+            masks = [0] * size
+            moves = []
+            for p in range(size):
+                for j in range(length):
+                    masks[p] |= 1 << cells[(p + j) % size]
+                if length >= size:
+                    # the vehicle fills its whole lane, it only ever enters
+                    # its own cells
+                    forward_bits = (0, 0)
+                    backward_bits = (0, 0)
+                else:
+                    forward_bits = (1 << cells[(p - 1) % size], 1 << cells[(p + length - 1) % size])
+                    backward_bits = (1 << cells[(p + length) % size], 1 << cells[p])
+                zobrist = self.zobrist[i]
+                moves.append((
+                    ((p - 1) % size,) + forward_bits + (zobrist[p] ^ zobrist[(p - 1) % size], 'move_vehicle(' + self.names[i] + ',' + directions[0] + ')'),
+                    ((p + 1) % size,) + backward_bits + (zobrist[p] ^ zobrist[(p + 1) % size], 'move_vehicle(' + self.names[i] + ',' + directions[1] + ')')))
+            self.masks.append(masks)
+            self.moves.append(moves)
+        # cells of the vehicles filling their whole lane: they can change
+        # position, but never vacate a cell
+        self.filled_lanes = 0
+        for i in range(len(vehicle_list)):
+            if self.lengths[i] >= self.lane_sizes[i]:
+                self.filled_lanes |= self.lane_masks[i]
+
+        # compiled goal test: a state is a goal iff goal_reachable and
+        # positions[goal_vehicle] == goal_position. goal_reachable is False
+        # if there is no goal vehicle or it can never be at the goal
+        # entrance (wrong lane or orientation), so no state is a goal.
+        self.goal = self.goal_target()
+        self.goal_reachable = self.goal is not None
+        if self.goal_reachable:
+            (self.goal_vehicle, self.goal_position) = self.goal
+        else:
+            (self.goal_vehicle, self.goal_position) = (None, None)
+
+        # heuristic tables, for the goal vehicle g and every position p in
+        # its lane:
+        #   goal_sweeps[p] = ((moves forward to the goal, mask of the cells
+        #                      its front enters on the way),
+        #                     (moves backward to the goal, mask of the cells
+        #                      its tail enters on the way))
+        # and lane_crossers = the other vehicles that can ever occupy a
+        # cell of the goal vehicle's lane.
+        self.goal_sweeps = None
+        self.lane_crossers = ()
+        if self.goal_reachable:
+            (g, t) = self.goal
+            cells = self.lane_cells[g]
+            size = self.lane_sizes[g]
+            length = self.lengths[g]
+            lane = self.lane_masks[g]
+            self.goal_sweeps = []
+            for p in range(size):
+                forward = (p - t) % size
+                backward = (t - p) % size
+                forward_mask = 0
+                for j in range(1, forward + 1):
+                    forward_mask |= 1 << cells[(p - j) % size]
+                backward_mask = 0
+                for j in range(backward):
+                    backward_mask |= 1 << cells[(p + length + j) % size]
+                self.goal_sweeps.append(((forward, forward_mask), (backward, backward_mask)))
+            self.lane_crossers = tuple(i for i in range(len(vehicle_list))
+                                       if i != g and any(mask & lane for mask in self.masks[i]))
+
+    def position(self, i, loc):
+        '''return the position of vehicle i when its front is at loc'''
+        return loc[0] if self.is_horizontal[i] else loc[1]
+
+    def loc(self, i, position):
+        '''return the location (x, y) of the front of vehicle i at position'''
+        return (position, self.lanes[i]) if self.is_horizontal[i] else (self.lanes[i], position)
+
+    def occupied(self, positions):
+        '''return the occupancy bitmask of the board'''
+        occupied = 0
+        masks = self.masks
+        for i in range(len(positions)):
+            occupied |= masks[i][positions[i]]
+        return occupied
+
+    def goal_target(self):
+        '''return (i, p) where i is the index of the goal vehicle and p is
+           the position at which it is at the goal entrance, or None if
+           there is no goal vehicle or it can never be at the entrance'''
+        (board_size, goal_entrance, goal_direction) = self.board_properties
+        for i in range(len(self.is_goal)):
+            if self.is_goal[i]:
+                break
+        else:
+            return None
+        size = self.lane_sizes[i]
+        if self.is_horizontal[i] and (goal_direction == 'E' or goal_direction == 'W'):
+            if self.lanes[i] != goal_entrance[1]:
+                return None
+            front = goal_entrance[0]
+        elif (not self.is_horizontal[i]) and (goal_direction == 'N' or goal_direction == 'S'):
+            if self.lanes[i] != goal_entrance[0]:
+                return None
+            front = goal_entrance[1]
+        else:
+            return None
+        if goal_direction == 'W' or goal_direction == 'N':
+            # the front of the vehicle must be at the entrance
+            return (i, front)
+        # the tail of the vehicle must be at the entrance
+        return (i, (front - self.lengths[i] + 1) % size)
+
+    def frozen_vehicles(self, positions):
+        '''Return the set of the vehicles that can never move from
+           positions: the largest set of vehicles every one of which is
+           blocked in both directions by vehicles of the set or by the
+           vehicles filling their whole lane (e.g., a cycle of vehicles
+           blocking each other). Since none of them can move first, none
+           ever moves.'''
+        frozen = set(range(len(positions)))
+        changed = True
+        while changed:
+            changed = False
+            occupied = self.filled_lanes
+            for i in frozen:
+                occupied |= self.masks[i][positions[i]]
+            for i in list(frozen):
+                for (position, entered, vacated, delta, action) in self.moves[i][positions[i]]:
+                    if not (entered & occupied):
+                        frozen.discard(i)
+                        changed = True
+                        break
+        return frozen
+
+    def infeasible(self, positions):
+        '''return None, or why no goal state can be reached from positions'''
+        if True not in self.is_goal:
+            return 'there is no goal vehicle'
+        if not self.goal_reachable:
+            return 'the goal vehicle can never be at the goal entrance'
+        (g, t) = self.goal
+        p = positions[g]
+        if p == t or self.lengths[g] >= self.lane_sizes[g]:
+            # a goal vehicle filling its lane can move to any position
+            return None
+        frozen = self.frozen_vehicles(positions)
+        if g in frozen:
+            return 'the goal vehicle can never move'
+        blocked = self.filled_lanes
+        for i in frozen:
+            blocked |= self.masks[i][positions[i]]
+        ((forward, forward_mask), (backward, backward_mask)) = self.goal_sweeps[p]
+        if (forward_mask & blocked) and (backward_mask & blocked):
+            return 'vehicles that can never move lock the goal lane'
+        return None
+
+    def zobrist_hash(self, positions):
+        '''return the zobrist hash of positions, computed from scratch'''
+        h = 0
+        zobrist = self.zobrist
+        for i in range(len(positions)):
+            h ^= zobrist[i][positions[i]]
+        return h
+
+
 class rushhour(StateSpace):
-    def __init__(self, action, gval, parent, vehicle_list, board_properties):
+    #every move can be undone by the opposite move
+    reversible = True
+
+    def __init__(self, action, gval, parent, problem, positions, zobrist = None, last = None):
 #IMPLEMENT
-        """Initialize a rushhour search state object."""
+        """Initialize a rushhour search state object.
+           problem is the rushhour_problem shared by all the states of a
+           search and positions is the tuple of the vehicles' positions.
+           zobrist is the state's zobrist hash, if the caller already
+           derived it from the parent's. last is None or, for move pruning,
+           (index of the vehicle moved by action, its position before the
+           move, bit of the cell it vacated).
+
+           The original form rushhour(action, gval, parent, vehicle_list,
+           board_properties) is still accepted: it builds a problem of its
+           own from the vehicle list (use make_init_state and successors()
+           to share one problem between states)."""
         StateSpace.__init__(self, action, gval, parent)
-        self.vehicle_list = vehicle_list
-        self.board_properties = board_properties
+        if not isinstance(problem, rushhour_problem):
+            (vehicle_list, board_properties) = (problem, positions)
+            problem = rushhour_problem(vehicle_list, board_properties)
+            positions = tuple(problem.position(i, vehicle_list[i][1]) for i in range(len(vehicle_list)))
+        self.problem = problem
+        self.positions = positions
+        if zobrist is None:
+            zobrist = problem.zobrist_hash(positions)
+        self.zobrist = zobrist
+        self.last = last
 
-    def successors(self):
+    def successors(self, prune = True):
 #IMPLEMENT
         '''Return list of rushhour objects that are the successors of the current object'''
         States = list()
-        board_size = self.board_properties[0]
-        occupied_dict =  {}
-        # store all vehicles' occupied spaces as a dictionary
-        for i in range(len(self.vehicle_list)):
-            vehicle_i = vehicle(self.vehicle_list[i])
-            loc_list = vehicle_i.occupied_space(board_size)
-            for loc in loc_list:
-                occupied_dict[loc] = vehicle_i.name
-        
-        for i in range(len(self.vehicle_list)):
-            vehicle_i = vehicle(self.vehicle_list[i])
-            actual_move_forward, actual_move_backward = vehicle_i.actual_moves(board_size, occupied_dict)
-            for actual_move in (actual_move_forward, actual_move_backward):
-                if actual_move != None:
-                    action = 'move_vehicle('+vehicle_i.name+','+actual_move[1] + ')'
-                    vehicle_i.loc = actual_move[0]
-                    new_vehicle_list = self.vehicle_list[:]
-                    new_vehicle_list[i] = vehicle_i.toList()
-                    new_rushhour = rushhour(action, self.gval+1, self, new_vehicle_list, self.board_properties)
-                    States.append(new_rushhour)
+        problem = self.problem
+        positions = self.positions
+        occupied = problem.occupied(positions)
+        moves = problem.moves
+        gval = self.gval + 1
+        zobrist = self.zobrist
+        #move pruning, see rushhour_problem
+        (j, back, freed) = (-1, -1, 0)
+        if prune and problem.prune_moves and self.last:
+            (j, back, freed) = self.last
+        for i in range(len(positions)):
+            p = positions[i]
+            for (position, entered, vacated, delta, action) in moves[i][p]:
+                if occupied & entered:
+                    continue
+                if i < j and not (entered & freed):
+                    continue
+                if i == j and position == back:
+                    continue
+                new_positions = positions[:i] + (position,) + positions[i + 1:]
+                States.append(rushhour(action, gval, self, problem, new_positions, zobrist ^ delta, (i, p, vacated)))
         return States
-            
-            
+
+    def unpruned_successors(self):
+        '''Return all the successors, without move pruning'''
+        return self.successors(False)
+
     def hashable_state(self):
 #IMPLEMENT
         '''Return a data item that can be used as a dictionary key to UNIQUELY represent the state.'''
-        
-        return tuple(tuple(x) for x in self.vehicle_list)
+        #In canonical mode the positions of each group of interchangeable
+        #vehicles are sorted, so permutations of them have the same key.
+
+        groups = self.problem.interchangeable
+        if not groups:
+            return self.positions
+        positions = list(self.positions)
+        for group in groups:
+            for (i, p) in zip(group, sorted([positions[i] for i in group])):
+                positions[i] = p
+        return tuple(positions)
+
+    def zobrist_hash(self):
+        '''Return the zobrist hash of the state, maintained incrementally by successors()'''
+        return self.zobrist
+
+    def infeasible(self):
+        '''Detect unsolvable instances before searching: no goal vehicle,
+           a goal vehicle in the wrong lane or orientation, or vehicles
+           that can never move blocking the goal vehicle's way to the goal
+           in both directions.'''
+        return self.problem.infeasible(self.positions)
+
+    def make_state(self, action, gval, parent, positions, last = None):
+        '''Return a state of the same problem (and class) as self with the
+           vehicles at positions'''
+        return rushhour(action, gval, parent, self.problem, positions, None, last)
+
+    def pack(self):
+        '''Return the positions and the vehicle and position before the last
+           move (for move pruning) as one int, for SearchEngine.node_store_on()'''
+        problem = self.problem
+        sizes = problem.lane_sizes
+        positions = self.positions
+        packed = 0
+        for i in range(len(positions) - 1, -1, -1):
+            packed = packed * sizes[i] + positions[i]
+        last = 0
+        if self.last:
+            last = 1 + self.last[0] * problem.max_lane_size + self.last[1]
+        return packed * (1 + len(positions) * problem.max_lane_size) + last
+
+    def unpack(self, packed, action, gval, parent):
+        '''Return the state of the same problem (and class) as self encoded
+           by packed (see pack)'''
+        problem = self.problem
+        (packed, last) = divmod(packed, 1 + len(self.positions) * problem.max_lane_size)
+        positions = []
+        for size in problem.lane_sizes:
+            (packed, p) = divmod(packed, size)
+            positions.append(p)
+        positions = tuple(positions)
+        if last:
+            (i, p) = divmod(last - 1, problem.max_lane_size)
+            last = self.last_move(i, p, positions)
+        else:
+            last = None
+        return self.make_state(action, gval, parent, positions, last)
+
+    def pack_key(self, packed):
+        '''Return the positions part of packed (see pack), in canonical
+           mode with the positions of interchangeable vehicles sorted as by
+           hashable_state()'''
+        problem = self.problem
+        packed = packed // (1 + len(self.positions) * problem.max_lane_size)
+        if not problem.interchangeable:
+            return packed
+        positions = []
+        for size in problem.lane_sizes:
+            (packed, p) = divmod(packed, size)
+            positions.append(p)
+        for group in problem.interchangeable:
+            for (i, p) in zip(group, sorted([positions[i] for i in group])):
+                positions[i] = p
+        return tuple(positions)
+
+    def state_bytes(self):
+        '''Return hashable_state() as bytes, one per vehicle, for external
+           memory search (lanes of up to 256 cells)'''
+        return bytes(self.hashable_state())
+
+    def from_state_bytes(self, data, action, gval, parent):
+        '''Return the state of the same problem (and class) as self with the
+           vehicles at the positions serialized as data (see state_bytes)'''
+        return self.make_state(action, gval, parent, tuple(data))
+
+    def last_move(self, i, p, positions):
+        '''Return the last move (see __init__) of the state with the
+           vehicles at positions, reached by moving vehicle i from p'''
+        masks = self.problem.masks
+        return (i, p, masks[i][p] & ~masks[i][positions[i]])
+
+    def goal_states(self):
+        '''Return (a generator of) all the states in which the goal vehicle
+           is at the goal and every other vehicle is anywhere in its lane
+           without overlapping another. Note that there are up to the product
+           of the lane sizes of the other vehicles of them.'''
+        problem = self.problem
+        if not problem.goal_reachable:
+            return
+        (g, p) = problem.goal
+        masks = problem.masks
+        sizes = problem.lane_sizes
+        n = len(self.positions)
+
+        def place(i, positions, occupied):
+            if i == n:
+                yield self.make_state('GOAL', 0, None, positions)
+            elif i == g:
+                yield from place(i + 1, positions + (p,), occupied)
+            else:
+                for q in range(sizes[i]):
+                    if not occupied & masks[i][q]:
+                        yield from place(i + 1, positions + (q,), occupied | masks[i][q])
+
+        yield from place(0, (), masks[g][p])
         
     def print_state(self):
         #DO NOT CHANGE THIS FUNCTION---it will be used in auto marking
@@ -174,6 +583,18 @@ class rushhour(StateSpace):
 
 #Data accessor routines.
 
+    @property
+    def vehicle_list(self):
+        '''The vehicle statuses, as the original rushhour kept them (see
+           get_vehicle_statuses)'''
+        return self.get_vehicle_statuses()
+
+    @property
+    def board_properties(self):
+        '''The board properties, as the original rushhour kept them (see
+           get_board_properties)'''
+        return self.problem.board_properties
+
     def get_vehicle_statuses(self):
 #IMPLEMENT
         '''Return list containing the status of each vehicle
@@ -190,7 +611,10 @@ class rushhour(StateSpace):
                  <is_goal> is true iff the vehicle is a goal vehicle
         '''
         
-        return self.vehicle_list
+        problem = self.problem
+        positions = self.positions
+        return [[problem.names[i], problem.loc(i, positions[i]), problem.lengths[i], problem.is_horizontal[i], problem.is_goal[i]]
+                for i in range(len(positions))]
         
     def get_board_properties(self):
 #IMPLEMENT
@@ -201,7 +625,84 @@ class rushhour(StateSpace):
                                 the orientation of the goal
         '''
         
-        return self.board_properties
+        return self.problem.board_properties
+
+class rushhour_slides(rushhour):
+    def __init__(self, action, gval, parent, problem, positions, zobrist = None, last = None):
+        '''A rushhour state whose actions slide one vehicle any
+           number k of free cells in one direction, move_vehicle(name,dir,k).
+           A slide costs k, or 1 if problem.slide_metric is 'moves'. For
+           move pruning last is (index of the vehicle moved by action, its
+           position before the slide, mask of every cell it occupied during
+           the slide).'''
+        rushhour.__init__(self, action, gval, parent, problem, positions, zobrist, last)
+
+    def make_state(self, action, gval, parent, positions, last = None):
+        '''Return a rushhour_slides state of the same problem as self with
+           the vehicles at positions'''
+        return rushhour_slides(action, gval, parent, self.problem, positions, None, last)
+
+    def last_move(self, i, p, positions):
+        '''Return the last move of the state with the vehicles at positions,
+           reached by sliding vehicle i from p. The cells it occupied during
+           the slide are not known, so the whole lane is used: this only
+           prunes fewer commuting slides.'''
+        return (i, p, self.problem.lane_masks[i])
+
+    def successors(self, prune = True):
+        '''Return list of rushhour_slides objects that are the successors of the current object'''
+        States = list()
+        problem = self.problem
+        positions = self.positions
+        board = problem.occupied(positions)
+        moves = problem.moves
+        masks = problem.masks
+        unit_cost = problem.slide_metric == 'moves'
+        #move pruning: two slides of the same vehicle in a row can always be
+        #made as one slide (at no more cost), so the last moved vehicle is
+        #not moved again, and slides of a vehicle with a smaller index that
+        #enter no cell the last moved vehicle occupied during its slide
+        #commute with it (see rushhour_problem)
+        (j, back, touched) = (-1, -1, 0)
+        if prune and problem.prune_moves and self.last:
+            (j, back, touched) = self.last
+        for i in range(len(positions)):
+            if i == j:
+                continue
+            p = positions[i]
+            size = problem.lane_sizes[i]
+            #follow the one cell moves in each direction for as long as the
+            #cells entered are free
+            slides = []
+            for d in (0, 1):
+                occupied = board
+                zobrist = self.zobrist
+                position = p
+                swept = 0
+                reached = []
+                for k in range(1, size):
+                    (position, entered, vacated, delta, action) = moves[i][position][d]
+                    if occupied & entered:
+                        break
+                    occupied = occupied ^ entered ^ vacated
+                    zobrist = zobrist ^ delta
+                    swept = swept | entered
+                    reached.append((k, position, occupied, zobrist, swept))
+                slides.append(reached)
+            if len(slides[0]) + len(slides[1]) >= size:
+                #the vehicle is alone in its lane and can go all the way
+                #round it in both directions: only keep the shorter slide
+                #to each position (direction 0 on ties)
+                slides = [slides[0][:size // 2], slides[1][:(size - 1) // 2]]
+            for d in (0, 1):
+                for (k, position, occupied, zobrist, swept) in slides[d]:
+                    if i < j and not (swept & touched):
+                        continue
+                    action = 'move_vehicle({},{},{})'.format(problem.names[i], problem.directions[i][d], k)
+                    gval = self.gval + (1 if unit_cost else k)
+                    new_positions = positions[:i] + (position,) + positions[i + 1:]
+                    States.append(rushhour_slides(action, gval, self, problem, new_positions, zobrist, (i, p, masks[i][p] | swept)))
+        return States
 
 #############################################
 # heuristics                                #
@@ -231,28 +732,70 @@ def heur_min_moves(state):
     #You should implement this heuristic function exactly, even if it is
     #tempting to improve it.
     
-    gv = find_goal_vehicle(state)
-    move_forward_gv = vehicle(gv.toList())
-    move_backward_gv = vehicle(gv.toList())
-    move_forward_count = 0
-    move_backward_count = 0
-    board_size = state.get_board_properties()[0]
-    goal_entrance = state.get_board_properties()[1]
-    goal_direction = state.get_board_properties()[2]
-    
+    #The number of moves in each direction is computed in closed form from
+    #the goal position precomputed by the problem.
+
+    problem = state.problem
     # goal vehicle can never reach goal state thus return -1
-    if rushhour_goal_gv(gv, board_size, goal_entrance, goal_direction) == -1:
+    if not problem.goal_reachable:
         return -1
-    
-    while (not rushhour_goal_gv(move_forward_gv, board_size, goal_entrance, goal_direction)):
-        move_forward_count += 1
-        move_forward_gv.move_forward(board_size)
-    
-    while (not rushhour_goal_gv(move_backward_gv, board_size, goal_entrance, goal_direction)):
-        move_backward_count += 1
-        move_backward_gv.move_backward(board_size)
-    
-    return min(move_forward_count, move_backward_count)
+    (g, t) = problem.goal
+    p = state.positions[g]
+    size = problem.lane_sizes[g]
+    return min((p - t) % size, (t - p) % size)
+
+def heur_blocking(state):
+    '''rushhour heuristic: heur_min_moves plus blocking vehicles'''
+    #On its way to the goal in either direction the goal vehicle must
+    #occupy every cell its front (moving forward) or its tail (moving
+    #backward) enters, so every other vehicle now on one of these cells
+    #must move at least once first. Hence for each direction
+    #    moves of the goal vehicle + number of vehicles blocking its way
+    #is a lower bound, and the minimum over the two directions is
+    #admissible. Only the vehicles that can ever cross the goal lane are
+    #checked, against the precomputed masks of the cells on the way.
+
+    problem = state.problem
+    if not problem.goal_reachable:
+        return -1
+    positions = state.positions
+    masks = problem.masks
+    ((forward, forward_mask), (backward, backward_mask)) = problem.goal_sweeps[positions[problem.goal[0]]]
+    for i in problem.lane_crossers:
+        mask = masks[i][positions[i]]
+        if mask & forward_mask:
+            forward += 1
+        if mask & backward_mask:
+            backward += 1
+    return min(forward, backward)
+
+def heur_slides(state):
+    '''rushhour heuristic for slides under the 'moves' metric'''
+    #A slide can take the goal vehicle any distance, but it still needs
+    #one slide if it is not at the goal, and every vehicle blocking its
+    #way (see heur_blocking) still needs at least one slide. So for each
+    #direction
+    #    (1 if the goal vehicle must move) + number of blocking vehicles
+    #is a lower bound on the number of slides, and the minimum over the
+    #two directions is admissible.
+
+    problem = state.problem
+    if not problem.goal_reachable:
+        return -1
+    positions = state.positions
+    masks = problem.masks
+    ((forward, forward_mask), (backward, backward_mask)) = problem.goal_sweeps[positions[problem.goal[0]]]
+    if forward == 0 or backward == 0:
+        return 0
+    forward = 1
+    backward = 1
+    for i in problem.lane_crossers:
+        mask = masks[i][positions[i]]
+        if mask & forward_mask:
+            forward += 1
+        if mask & backward_mask:
+            backward += 1
+    return min(forward, backward)
 
 def find_goal_vehicle(state):
     '''
@@ -260,8 +803,9 @@ def find_goal_vehicle(state):
     '''
     
     gv = None
-    for i in range(len(state.vehicle_list)):
-        vehicle_i = vehicle(state.vehicle_list[i])
+    vehicle_statuses = state.get_vehicle_statuses()
+    for i in range(len(vehicle_statuses)):
+        vehicle_i = vehicle(vehicle_statuses[i])
         if vehicle_i.is_goal:
             gv = vehicle_i
             break
@@ -270,15 +814,12 @@ def find_goal_vehicle(state):
 def rushhour_goal_fn(state):
 #IMPLEMENT
     '''Have we reached a goal state'''
-    
-    board_size = state.get_board_properties()[0]
-    goal_entrance = state.get_board_properties()[1]
-    goal_direction = state.get_board_properties()[2]
-    gv = find_goal_vehicle(state)
-    result = rushhour_goal_gv(gv, board_size, goal_entrance, goal_direction)
-    if result == -1:
-        return False
-    return result
+    #The goal vehicle and the position at which it is at the goal entrance
+    #are compiled once by the problem (see rushhour_problem.goal_target),
+    #so this is a single lookup and compare.
+
+    problem = state.problem
+    return problem.goal_reachable and state.positions[problem.goal_vehicle] == problem.goal_position
 
 def rushhour_goal_gv(gv, board_size, goal_entrance, goal_direction):
     '''
@@ -308,7 +849,7 @@ def rushhour_goal_gv(gv, board_size, goal_entrance, goal_direction):
     else:
         return -1
 
-def make_init_state(board_size, vehicle_list, goal_entrance, goal_direction):
+def make_init_state(board_size, vehicle_list, goal_entrance, goal_direction, canonical = False, prune_moves = True):
 #IMPLEMENT
     '''Input the following items which specify a state and return a rushhour object
        representing this initial state.
@@ -333,15 +874,36 @@ def make_init_state(board_size, vehicle_list, goal_entrance, goal_direction):
          (a) no vehicle name is repeated
          (b) all locations are integer pairs (x,y) where 0<=x<=n-1 and 0<=y<=m-1
          (c) vehicle lengths are positive integers
+
+   If canonical is True states that differ only by a permutation of
+   interchangeable vehicles (non-goal, same length, same lane) are treated
+   as the same state by cycle checking, and if prune_moves is False
+   successors() generates every legal move (see rushhour_problem).
     '''
     
     state_gval = 0
     state_parent = None
     state_action = 'START'
     board_properties = (board_size, goal_entrance, goal_direction)
-    state = rushhour(state_action, state_gval, state_parent, vehicle_list, board_properties)
+    problem = rushhour_problem(vehicle_list, board_properties, canonical, prune_moves)
+    positions = tuple(problem.position(i, vehicle_list[i][1]) for i in range(len(vehicle_list)))
+    state = rushhour(state_action, state_gval, state_parent, problem, positions)
     return state
 
+def make_slide_init_state(board_size, vehicle_list, goal_entrance, goal_direction, metric = 'distance', canonical = False, prune_moves = True):
+    '''Same as make_init_state but return a rushhour_slides object, whose
+       actions slide a vehicle any number of free cells at once. metric is
+       the cost of a slide: 'distance' (the number of cells, so solution
+       costs are the same as with one cell moves and heur_min_moves and
+       heur_blocking are admissible) or 'moves' (1 per slide, use
+       heur_slides).'''
+
+    if metric != 'distance' and metric != 'moves':
+        raise ValueError("slide metric must be 'distance' or 'moves', not {}".format(metric))
+    s = make_init_state(board_size, vehicle_list, goal_entrance, goal_direction, canonical, prune_moves)
+    s.problem.slide_metric = metric
+    return rushhour_slides(s.action, s.gval, s.parent, s.problem, s.positions, s.zobrist)
+
 ########################################################
 #   Functions provided so that you can more easily     #
 #   Test your implementation                           #
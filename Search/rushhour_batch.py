@@ -0,0 +1,138 @@
+'''
+Batch solving of rushhour instances on a pool of processes.
+
+Instances are read from a JSON lines file, one object per line:
+
+    {"id": "a1", "board_size": [6, 6], "goal_entrance": [5, 2], "goal_direction": "E",
+     "vehicle_list": [["gv", [0, 2], 2, true, true], ["1", [3, 0], 3, false, false], ...]}
+
+where the fields are the arguments of make_init_state and "id" is
+optional (it defaults to the line number). Each instance is solved by a
+worker process with a quiet SearchEngine, bounded by a time budget (see
+SearchEngine.set_budget, 60 seconds by default), and its result is written as a JSON line as soon
+as it is done, so the results come out in completion order:
+
+    {"id": "a1", "solved": true, "cost": 8, "actions": ["move_vehicle(1,S)", ...],
+     "nodes_expanded": 412, "nodes_generated": 1418, "states_generated": 1630, "cycle_check_pruned": 212,
+     "search_time": 0.031, "budget_exhausted": null, "infeasible": null}
+
+A line that isn't a valid instance gives {"id": ..., "error": "..."}.
+Only a few instances per worker are in flight at any time, so memory use
+doesn't grow with the number of instances.
+
+Example:
+
+    solve_batch('boards.jsonl', 'results.jsonl', workers = 4, max_seconds = 10)
+
+or from the command line:
+
+    python rushhour_batch.py boards.jsonl results.jsonl --workers 4 --max-seconds 10
+'''
+
+from rushhour import *
+import argparse
+import concurrent.futures
+import json
+import os
+
+#The heuristics that can be named in a batch
+HEURISTICS = {'zero': heur_zero,
+              'min_moves': heur_min_moves,
+              'blocking': heur_blocking}
+
+#Number of instances submitted to the pool per worker, the others wait in
+#the input file
+_IN_FLIGHT = 4
+
+
+def parse_instance(line):
+    '''Return (board_size, vehicle_list, goal_entrance, goal_direction) of
+       a JSON encoded instance, with the pairs as tuples'''
+    instance = json.loads(line)
+    vehicle_list = [[name, tuple(loc), length, is_horizontal, is_goal]
+                    for (name, loc, length, is_horizontal, is_goal) in instance['vehicle_list']]
+    return (tuple(instance['board_size']), vehicle_list,
+            tuple(instance['goal_entrance']), instance['goal_direction'])
+
+
+def result_record(result):
+    '''Return the JSON encodable fields of a SearchResult'''
+    return {'solved': result.solved,
+            'cost': result.cost,
+            'actions': result.actions,
+            'nodes_expanded': result.nodes_expanded,
+            'nodes_generated': result.nodes_generated,
+            'states_generated': result.states_generated,
+            'cycle_check_pruned': result.cycle_check_pruned,
+            'search_time': result.search_time,
+            'budget_exhausted': result.budget_exhausted,
+            'infeasible': result.infeasible}
+
+
+def solve_instance(number, line, strategy = 'astar', heuristic = 'blocking', max_seconds = 60):
+    '''Solve the instance on line number of a batch and return its result
+       record (the job of a worker process)'''
+    record = {'id': number}
+    try:
+        instance_id = json.loads(line).get('id')
+        if instance_id is not None:
+            record['id'] = instance_id
+        (board_size, vehicle_list, goal_entrance, goal_direction) = parse_instance(line)
+        s0 = make_init_state(board_size, vehicle_list, goal_entrance, goal_direction)
+        se = SearchEngine(strategy, 'full')
+        se.quiet_on()
+        se.set_budget(max_seconds = max_seconds)
+        record.update(result_record(se.solve(s0, rushhour_goal_fn, HEURISTICS[heuristic])))
+    except Exception as e:
+        record['error'] = '{}: {}'.format(type(e).__name__, e)
+    return record
+
+
+def solve_batch(infile, outfile, workers = None, strategy = 'astar', heuristic = 'blocking', max_seconds = 60):
+    '''Solve the instances of the JSON lines file infile on workers
+       processes (by default one per cpu) and write their results to the
+       JSON lines file outfile in completion order. Each instance is
+       solved with strategy (one of STRATEGIES) and the heuristic named
+       heuristic (see HEURISTICS) for at most max_seconds seconds (None
+       for no limit). Return the number of instances.'''
+    if strategy not in STRATEGIES:
+        raise ValueError('Unknown search strategy {}, must be one of {}'.format(strategy, STRATEGIES))
+    if heuristic not in HEURISTICS:
+        raise ValueError('Unknown heuristic {}, must be one of {}'.format(heuristic, sorted(HEURISTICS)))
+    if workers is None:
+        workers = os.cpu_count() or 1
+    count = 0
+    with open(infile) as instances, open(outfile, 'w') as results, \
+         concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        in_flight = set()
+        limit = _IN_FLIGHT * workers
+        for line in instances:
+            count = count + 1
+            if not line.strip():
+                continue
+            in_flight.add(pool.submit(solve_instance, count, line, strategy, heuristic, max_seconds))
+            if len(in_flight) >= limit:
+                done, in_flight = concurrent.futures.wait(in_flight, return_when = concurrent.futures.FIRST_COMPLETED)
+                write_results(done, results)
+        for future in concurrent.futures.as_completed(in_flight):
+            write_results([future], results)
+    return count
+
+
+def write_results(futures, results):
+    '''Write the result records of the finished futures as JSON lines'''
+    for future in futures:
+        results.write(json.dumps(future.result()) + '\n')
+    results.flush()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Solve a JSON lines file of rushhour instances.')
+    parser.add_argument('infile')
+    parser.add_argument('outfile')
+    parser.add_argument('--workers', type = int, default = None)
+    parser.add_argument('--strategy', default = 'astar', choices = STRATEGIES)
+    parser.add_argument('--heuristic', default = 'blocking', choices = sorted(HEURISTICS))
+    parser.add_argument('--max-seconds', type = float, default = 60)
+    args = parser.parse_args()
+    solve_batch(args.infile, args.outfile, args.workers, args.strategy, args.heuristic, args.max_seconds)
@@ -0,0 +1,129 @@
+'''
+Pattern database heuristics for rushhour.
+
+A pattern database (PDB) abstracts the board to the goal vehicle plus a
+chosen subset (the pattern) of the other vehicles: the remaining vehicles
+are simply removed. Since removing vehicles only removes obstacles, the
+number of moves needed to solve the abstract board is a lower bound on the
+number needed to solve the real one. The abstract distances of all
+abstract states are precomputed once by retrograde analysis (a breadth
+first search backwards from the abstract goal states, see
+rushhour_retrograde) and stored as a packed one byte per state array in a
+table file that is memory mapped for lookups. The build cost is thus paid
+once per board and vehicle configuration.
+
+Several PDBs can be combined. The max of any PDBs is admissible. The sum
+of PDBs is admissible if they are additive, i.e., the sets of vehicles
+whose moves they count are disjoint: each PDB is built with a set of
+counted vehicles, and the moves of the other vehicles of its pattern are
+free in its abstract space.
+
+Example:
+
+    s0 = make_init_state(...)
+    pdb1 = build_pattern_database(s0, ['1', '2', '3'], 'p1.rhdt')
+    pdb2 = build_pattern_database(s0, ['4', '5'], 'p2.rhdt')
+    h = pdb_max(pdb1, pdb2)
+    #or, counting each vehicle's moves in one PDB only,
+    pdb3 = build_pattern_database(s0, ['1', '2'], 'p3.rhdt', counted = ['gv', '1', '2'])
+    pdb4 = build_pattern_database(s0, ['3', '4'], 'p4.rhdt', counted = ['3', '4'])
+    h = pdb_max(pdb1, pdb_sum(pdb3, pdb4))
+    se.search(s0, rushhour_goal_fn, h)
+    #later runs on the same configuration just reload the tables
+    pdb1 = pattern_database('p1.rhdt')
+'''
+
+from rushhour_retrograde import *
+
+
+def build_pattern_database(state, vehicles, filename, counted = None):
+    '''Build the pattern database of the rushhour state's problem for the
+       goal vehicle plus the vehicles named in vehicles, write it to
+       filename and return it. counted names the vehicles whose moves are
+       counted (by default every vehicle of the pattern).'''
+    problem = state.problem
+    pattern = [i for i in range(len(problem.names))
+               if problem.is_goal[i] or problem.names[i] in vehicles]
+    vehicle_statuses = state.get_vehicle_statuses()
+    (board_size, goal_entrance, goal_direction) = problem.board_properties
+    abstract_state = make_init_state(board_size, [vehicle_statuses[i] for i in pattern], goal_entrance, goal_direction)
+    if counted is None:
+        abstract_counted = None
+    else:
+        abstract_counted = [j for j in range(len(pattern)) if problem.names[pattern[j]] in counted]
+
+    description = problem_description(problem)
+    description['pattern'] = pattern
+    description['counted'] = abstract_counted
+    description['lane_sizes'] = abstract_state.problem.lane_sizes
+    write_table(filename, description, retrograde_distances(abstract_state, abstract_counted))
+    return pattern_database(filename)
+
+
+class pattern_database(mapped_table):
+    '''
+    memory mapped lookup in a table written by build_pattern_database.
+    Can be passed to SearchEngine.search as the heuristic function.
+    '''
+
+    def __init__(self, filename):
+        mapped_table.__init__(self, filename)
+        #pairs (index of a pattern vehicle, weight of its position in the
+        #rank of the abstract state), set when the PDB is first used
+        self.weights = None
+
+    def matches(self, problem):
+        '''return True iff the PDB was built for the board and vehicle set
+           of problem'''
+        description = dict(self.description)
+        del description['pattern'], description['counted'], description['lane_sizes']
+        return json.loads(json.dumps(problem_description(problem))) == description
+
+    def size(self, problem):
+        '''return the number of distances of the PDB (the product of the
+           lane sizes of the pattern vehicles)'''
+        size = 1
+        for lane_size in self.description['lane_sizes']:
+            size = size * lane_size
+        return size
+
+    def distance(self, state):
+        '''return the abstract distance of state to the goal (the PDB is
+           checked against the problem of the first state looked up)'''
+        weights = self.weights
+        if weights is None:
+            self.check(state.problem)
+            weights = []
+            weight = 1
+            for (i, size) in zip(self.description['pattern'], self.description['lane_sizes']):
+                weights.append((i, weight))
+                weight = weight * size
+            self.weights = weights
+        positions = state.positions
+        rank = self.offset
+        for (i, weight) in weights:
+            rank += positions[i] * weight
+        return self.data[rank]
+
+    __call__ = distance
+
+
+class pdb_max:
+    '''the max of several admissible heuristics (e.g., PDBs)'''
+
+    def __init__(self, *heuristics):
+        self.heuristics = heuristics
+
+    def __call__(self, state):
+        return max(h(state) for h in self.heuristics)
+
+
+class pdb_sum:
+    '''the sum of additive PDBs, i.e., of PDBs counting the moves of
+       disjoint sets of vehicles'''
+
+    def __init__(self, *heuristics):
+        self.heuristics = heuristics
+
+    def __call__(self, state):
+        return sum(h(state) for h in self.heuristics)
@@ -0,0 +1,281 @@
+'''
+Retrograde analysis of rushhour.
+
+For a fixed board and vehicle set the rushhour state space is finite, so
+we can compute, once, the exact number of moves from every state to the
+goal by a breadth first search backwards from all the goal states (every
+move is reversible, so the predecessors of a state are its successors).
+The distances are stored in a compact on-disk array with one byte per
+state, indexed by a perfect ranking of the states, and looked up through
+a memory map. After that, solving any start position of the same board
+and vehicle set takes one table lookup per move of the solution, and the
+table is a perfect heuristic for SearchEngine.
+
+The ranking is the mixed radix number whose digits are the vehicles'
+positions in their lanes:
+
+    rank = positions[0] + lane_sizes[0] * (positions[1] + lane_sizes[1] * (...))
+
+so the table has one entry per element of the product of the lane sizes
+(placements with overlapping vehicles are unused entries). This limits
+retrograde analysis to boards and vehicle sets where that product fits on
+disk, e.g., a 6x6 board with up to about 10 vehicles.
+
+Example:
+
+    s0 = make_init_state(...)
+    write_distance_table(s0, 'board.rhdt')
+    table = distance_table('board.rhdt')
+    table.distance(s0)              #number of moves to the goal
+    table.solve(s0)                 #an optimal path, as a list of states
+    se.search(s0, rushhour_goal_fn, table)   #table is a perfect heuristic
+'''
+
+from rushhour import *
+import json
+import mmap
+import struct
+
+#Distance stored for states from which no goal state can be reached (and
+#for the unused entries of overlapping placements).
+UNREACHABLE = 255
+
+_MAGIC = b'RHDT'
+
+
+def state_radix(problem):
+    '''return the weight of each vehicle's position in the rank of a state'''
+    radix = []
+    weight = 1
+    for size in problem.lane_sizes:
+        radix.append(weight)
+        weight = weight * size
+    return radix
+
+
+def table_size(problem):
+    '''return the number of entries of a table for problem'''
+    size = 1
+    for lane_size in problem.lane_sizes:
+        size = size * lane_size
+    return size
+
+
+def state_rank(problem, positions):
+    '''return the rank of the state with the vehicles at positions'''
+    rank = 0
+    for i in range(len(positions) - 1, -1, -1):
+        rank = rank * problem.lane_sizes[i] + positions[i]
+    return rank
+
+
+def state_unrank(problem, rank):
+    '''return the positions of the state with the given rank'''
+    positions = []
+    for size in problem.lane_sizes:
+        (rank, p) = divmod(rank, size)
+        positions.append(p)
+    return tuple(positions)
+
+
+def retrograde_distances(state, counted = None):
+    '''Return a bytearray holding, for every rank of the problem of the
+       rushhour state, the number of moves from that state to the goal
+       (UNREACHABLE if there is none). Computed by breadth first search
+       backwards from all the goal states.
+
+       If counted is given, only the moves of the vehicles whose indices
+       are in counted cost 1 and the moves of the others are free (a layer
+       is closed under free moves before the next one is generated).'''
+    problem = state.problem
+    radix = state_radix(problem)
+    moves = problem.moves
+    distances = bytearray([UNREACHABLE]) * table_size(problem)
+    if counted is None:
+        counted = range(len(state.positions))
+    free = [i for i in range(len(state.positions)) if i not in counted]
+    counted = [i for i in range(len(state.positions)) if i in counted]
+
+    #a layer is a list of (rank, positions, occupancy) of the states at
+    #the same distance from the goal
+    layer = []
+    for goal_state in state.goal_states():
+        positions = goal_state.positions
+        rank = state_rank(problem, positions)
+        distances[rank] = 0
+        layer.append((rank, positions, problem.occupied(positions)))
+
+    distance = 0
+    while layer:
+        if free:
+            #add the states reached from the layer by free moves
+            stack = list(layer)
+            while stack:
+                label_successors(stack.pop(), free, moves, radix, distances, distance, (layer, stack))
+        distance = distance + 1
+        new_layer = []
+        for entry in layer:
+            label_successors(entry, counted, moves, radix, distances, distance, (new_layer,))
+        if new_layer and distance >= UNREACHABLE:
+            raise ValueError('rushhour distances do not fit in a byte')
+        layer = new_layer
+    return distances
+
+
+def label_successors(entry, vehicles, moves, radix, distances, distance, layers):
+    '''Label with distance the unlabelled states reached from entry by
+       moving one of vehicles, and append them to each list in layers'''
+    (rank, positions, occupied) = entry
+    for i in vehicles:
+        p = positions[i]
+        for (position, entered, vacated, delta, action) in moves[i][p]:
+            if occupied & entered:
+                continue
+            new_rank = rank + (position - p) * radix[i]
+            if distances[new_rank] != UNREACHABLE:
+                continue
+            distances[new_rank] = distance
+            new_entry = (new_rank, positions[:i] + (position,) + positions[i + 1:], occupied ^ entered ^ vacated)
+            for layer in layers:
+                layer.append(new_entry)
+
+
+def problem_description(problem):
+    '''return the data identifying the board and vehicle set of problem'''
+    return {'board_properties': problem.board_properties,
+            'names': problem.names,
+            'lengths': problem.lengths,
+            'is_horizontal': problem.is_horizontal,
+            'is_goal': problem.is_goal,
+            'lanes': problem.lanes}
+
+
+def write_table(filename, description, distances):
+    '''Write a table file: the magic bytes, the length of the json encoded
+       description, the description and then the distances.'''
+    header = json.dumps(description).encode()
+    with open(filename, 'wb') as f:
+        f.write(_MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        f.write(distances)
+
+
+def open_table(filename):
+    '''Memory map a table file and return (file, map, description, offset
+       of the distances in the map)'''
+    f = open(filename, 'rb')
+    try:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        #an empty file can't be mapped
+        f.close()
+        raise ValueError('{} is not a rushhour table file'.format(filename))
+    try:
+        if len(data) < 8 or data[:4] != _MAGIC:
+            raise ValueError('{} is not a rushhour table file'.format(filename))
+        (length,) = struct.unpack('<I', data[4:8])
+        if 8 + length > len(data):
+            raise ValueError('{} has a truncated header'.format(filename))
+        try:
+            description = json.loads(data[8:8 + length].decode())
+        except ValueError:
+            #UnicodeDecodeError and json's errors are ValueErrors
+            raise ValueError('{} has a corrupt header'.format(filename))
+    except ValueError:
+        data.close()
+        f.close()
+        raise
+    return (f, data, description, 8 + length)
+
+
+def write_distance_table(state, filename):
+    '''Compute the distance table of the problem of the rushhour state and
+       write it to filename'''
+    write_table(filename, problem_description(state.problem), retrograde_distances(state))
+
+
+class mapped_table:
+    '''
+    a table file written by write_table, memory mapped. Subclasses look
+    states up in it and say which problems it was built for (matches) and
+    how many distances it holds for them (size).
+    '''
+
+    def __init__(self, filename):
+        self.filename = filename
+        (self.file, self.data, self.description, self.offset) = open_table(filename)
+
+    def __getstate__(self):
+        # pickle by file name so tables can be sent to worker processes
+        return self.filename
+
+    def __setstate__(self, filename):
+        self.__init__(filename)
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def check(self, problem):
+        '''raise ValueError unless the table matches problem'''
+        if not self.matches(problem):
+            raise ValueError('{} was built for another board or vehicle set'.format(self.filename))
+        if len(self.data) - self.offset != self.size(problem):
+            raise ValueError('{} has {} distances instead of {}'.format(self.filename, len(self.data) - self.offset, self.size(problem)))
+
+
+class distance_table(mapped_table):
+    '''
+    memory mapped lookup in a table written by write_distance_table. Can
+    be passed to SearchEngine.search as the heuristic function: it returns
+    the exact number of moves to the goal (UNREACHABLE for states that
+    can't reach it, for which any value is admissible).
+    '''
+
+    def __init__(self, filename):
+        mapped_table.__init__(self, filename)
+        self.radix = None
+
+    def matches(self, problem):
+        '''return True iff the table was built for the board and vehicle
+           set of problem'''
+        return json.loads(json.dumps(problem_description(problem))) == self.description
+
+    def size(self, problem):
+        '''return the number of distances of the table of problem'''
+        return table_size(problem)
+
+    def distance(self, state):
+        '''return the number of moves from state to the goal (the table is
+           checked against the problem of the first state looked up)'''
+        radix = self.radix
+        if radix is None:
+            self.check(state.problem)
+            radix = self.radix = state_radix(state.problem)
+        positions = state.positions
+        rank = 0
+        for i in range(len(positions)):
+            rank += positions[i] * radix[i]
+        return self.data[self.offset + rank]
+
+    __call__ = distance
+
+    def solve(self, state):
+        '''Return an optimal path from state to the goal as a list of
+           states (starting with state), or None if there is none. Each
+           step moves to a successor one move closer to the goal.'''
+        d = self.distance(state)
+        if d == UNREACHABLE:
+            return None
+        path = [state]
+        while d > 0:
+            for succ in state.unpruned_successors():
+                if self.distance(succ) == d - 1:
+                    state = succ
+                    break
+            else:
+                raise ValueError('{} is inconsistent: no successor of a state at distance {} is at distance {}'.format(self.filename, d, d - 1))
+            d = d - 1
+            path.append(state)
+        return path
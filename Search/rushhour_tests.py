@@ -1,7 +1,22 @@
 #import student's function
 from rushhour import *
+from rushhour_batch import solve_batch
+from portfolio import portfolio_search
+from rushhour_pdb import build_pattern_database, pattern_database
+from rushhour_retrograde import write_distance_table, distance_table, state_rank, UNREACHABLE
+import contextlib
+import io
+import json
+import os
+import pickle
+import random
+import shutil
+import signal
+import tempfile
+import threading
+import time
 
-passingMark = 7
+passingMark = 37
 
 vehicle_list = [['gv', (1, 1), 2, True, True],
               ['1', (3, 1), 2, False, False],
@@ -46,6 +61,68 @@ s5_heur = 3
 
 totalTests = 0
 
+def heur_broken(state):
+    '''a heuristic that fails, for the portfolio tests'''
+    raise KeyError(state.hashable_state())
+
+def heur_delayed(state):
+    '''heur_blocking, slowed down so the other configurations of a race
+       get going before it wins'''
+    time.sleep(0.05)
+    return heur_blocking(state)
+
+def heur_stalled(state):
+    '''a heuristic that keeps a configuration busy until it is stopped'''
+    time.sleep(60)
+    return 0
+
+#number of calls of heur_tiring in this process
+tiring_calls = 0
+
+def heur_tiring(state):
+    '''heur_blocking, slowed down after its first 90 calls'''
+    global tiring_calls
+    tiring_calls += 1
+    if tiring_calls > 90:
+        time.sleep(0.05)
+    return heur_blocking(state)
+
+class colliding_state(StateSpace):
+    '''a rushhour state whose zobrist hash keeps only 2 bits, so that
+       many states collide'''
+
+    def __init__(self, action, gval, parent, state):
+        StateSpace.__init__(self, action, gval, parent)
+        self.state = state
+
+    def successors(self):
+        return [colliding_state(succ.action, succ.gval, self, succ) for succ in self.state.successors()]
+
+    def hashable_state(self):
+        return self.state.hashable_state()
+
+    def zobrist_hash(self):
+        return self.state.zobrist_hash() & 3
+
+def forked_processes():
+    '''Return the ids of the other processes running this script (the
+       forked ones), or an empty set without a /proc file system'''
+    try:
+        with open('/proc/self/cmdline', 'rb') as f:
+            cmdline = f.read()
+        pids = set()
+        for pid in os.listdir('/proc'):
+            if pid.isdigit() and int(pid) != os.getpid():
+                try:
+                    with open(os.path.join('/proc', pid, 'cmdline'), 'rb') as f:
+                        if f.read() == cmdline:
+                            pids.add(int(pid))
+                except OSError:
+                    pass
+        return pids
+    except OSError:
+        return set()
+
 if __name__ == '__main__':
     s = make_init_state((7, 7), [['gv', (1, 1), 2, True, True],
               ['1', (3, 1), 2, False, False],
@@ -293,6 +370,652 @@ if __name__ == '__main__':
                        [['gv', (4, 0), 2, False, True]],
                        (4, 1), 'E')''')
 
+    print("--------------------------------")
+    print("Now testing the memory budget of SearchEngine:")
+    #a transient allocation raises the peak but not the current memory
+    transient = bytearray(400 << 20)
+    del transient
+    se = SearchEngine('astar', 'full')
+    se.quiet_on()
+    se.set_budget(max_memory = 200 << 20)
+    result = se.solve(s, rushhour_goal_fn, heur_blocking)
+    if result.solved and result.budget_exhausted is None:
+        print("\t A 200 MB memory budget isn't exhausted by an earlier transient allocation.")
+        totalTests += 1
+    else:
+        print("\t ERROR: The memory budget was exhausted by an allocation that was already freed.")
+        print("\t budget_exhausted is %s" % result.budget_exhausted)
+
+    print("--------------------------------")
+    print("Now testing the infeasibility check of a lane filling vehicle:")
+    #the vertical vehicle fills column 3 and so blocks the goal lane for good
+    s_filled = make_init_state((5, 5), [['gv', (0, 2), 2, True, True],
+                                        ['1', (3, 0), 5, False, False]], (4, 2), 'E')
+    if s_filled.problem.infeasible(s_filled.positions) is not None:
+        print("\t A vehicle filling its lane across the goal lane makes the problem infeasible.")
+        totalTests += 1
+    else:
+        print("\t ERROR: infeasible() missed a vehicle filling its lane across the goal lane.")
+
+    print("--------------------------------")
+    print("Now testing the anytime_search generator of SearchEngine:")
+    se = SearchEngine('anytime_astar', 'full')
+    se.set_weight(3)
+    solutions = list(se.anytime_search(s, rushhour_goal_fn, heur_blocking))
+    if solutions and solutions[-1][0].gval == 3 and solutions[-1][1] == 1 and len(se.iteration_stats) == len(solutions):
+        print("\t anytime_search on a fresh engine ends with an optimal solution of cost 3.")
+        totalTests += 1
+    else:
+        print("\t ERROR: anytime_search should end with a solution of cost 3 and bound 1.")
+        print("\t Your solutions were %s" % [(state.gval, bound) for (state, bound) in solutions])
+
+    print("--------------------------------")
+    print("Now testing bidirectional search with a very large set of goal states:")
+    s_many = make_init_state((8, 8), [['gv', (6, 6), 2, False, True], ['1', (7, 6), 3, True, False],
+                                      ['2', (5, 3), 3, False, False], ['3', (2, 1), 2, True, False],
+                                      ['4', (4, 1), 3, False, False], ['5', (7, 1), 3, True, False],
+                                      ['6', (6, 0), 3, True, False], ['7', (3, 5), 2, False, False],
+                                      ['8', (1, 4), 2, True, False], ['9', (1, 2), 2, False, False],
+                                      ['10', (1, 7), 2, True, False], ['11', (3, 0), 2, True, False]], (6, 3), 'N')
+    #each goal state drawn counts against the budget, so enumerating them
+    #all up front would exhaust it
+    se = SearchEngine('bidirectional', 'full')
+    se.quiet_on()
+    se.set_budget(max_expansions = 50000)
+    result = se.solve(s_many, rushhour_goal_fn)
+    if result.solved and result.cost == 3:
+        print("\t Bidirectional search found the solution of cost 3 without enumerating every goal state.")
+        totalTests += 1
+    else:
+        print("\t ERROR: Bidirectional search should find a solution of cost 3 within 50000 expansions.")
+        print("\t It returned cost %s, budget exhausted: %s" % (result.cost, result.budget_exhausted))
+
+    print("--------------------------------")
+    print("Now testing the SearchResult of SearchEngine.solve:")
+    se = SearchEngine('astar', 'full')
+    report = io.StringIO()
+    with contextlib.redirect_stdout(report):
+        result = se.solve(s, rushhour_goal_fn, heur_blocking)
+    if (result.cost == 3 and result.nodes_expanded == 3 and result.nodes_generated == 14 and
+        report.getvalue() == ''):
+        print("\t solve() quietly returned a result with 3 nodes expanded and 14 generated.")
+        totalTests += 1
+    else:
+        print("\t ERROR: solve() should print nothing and count 3 nodes expanded and 14 generated.")
+        print("\t Your result had %s nodes expanded, %s generated and printed %d characters" % (result.nodes_expanded, result.nodes_generated, len(report.getvalue())))
+
+    print("--------------------------------")
+    print("Now testing the batch solver:")
+    batch_dir = tempfile.mkdtemp()
+    batch_in = os.path.join(batch_dir, 'boards.jsonl')
+    batch_out = os.path.join(batch_dir, 'results.jsonl')
+    with open(batch_in, 'w') as boards:
+        boards.write(json.dumps({'id': 's', 'board_size': board_size, 'goal_entrance': goal_entrance,
+                                 'goal_direction': goal_orientation, 'vehicle_list': vehicle_list}) + '\n')
+    try:
+        solve_batch(batch_in, batch_out, strategy = 'a_star')
+        rejected = False
+    except ValueError:
+        rejected = True
+    solve_batch(batch_in, batch_out, workers = 1)
+    with open(batch_out) as results:
+        records = [json.loads(line) for line in results]
+    shutil.rmtree(batch_dir)
+    if rejected and len(records) == 1 and records[0]['id'] == 's' and records[0]['cost'] == 3:
+        print("\t The batch solver rejected an unknown strategy and solved the instance with cost 3.")
+        totalTests += 1
+    else:
+        print("\t ERROR: solve_batch should reject the strategy 'a_star' and solve the instance with cost 3.")
+        print("\t Rejected: %s, results: %s" % (rejected, records))
+
+    print("--------------------------------")
+    print("Now testing the successors on a board with 3 rows and 6 columns:")
+    #horizontal vehicles wrap around the 6 columns of their row
+    s_wide = make_init_state((3, 6), [['gv', (4, 1), 2, True, True]], (1, 1), 'W')
+    wide_fronts = sorted(succ.get_vehicle_statuses()[0][1] for succ in s_wide.successors())
+    #with column 0 filled the vehicle can't wrap round into it
+    s_wide_blocked = make_init_state((3, 6), [['gv', (4, 1), 2, True, True], ['1', (0, 0), 3, False, False]], (1, 1), 'W')
+    blocked_fronts = sorted(succ.get_vehicle_statuses()[0][1] for succ in s_wide_blocked.successors()
+                            if succ.get_vehicle_statuses()[0][1] != (4, 1))
+    if wide_fronts == [(3, 1), (5, 1)] and blocked_fronts == [(3, 1)]:
+        print("\t The vehicle at x = 4 moves to x = 3 and x = 5, wrapping round the 6 columns.")
+        totalTests += 1
+    else:
+        print("\t ERROR: The vehicle at (4, 1) should move to (3, 1) and (5, 1), and only to (3, 1) when column 0 is full.")
+        print("\t Your successors moved it to %s and %s" % (wide_fronts, blocked_fronts))
+
+    print("--------------------------------")
+    print("Now testing path checking with a node store:")
+    store_results = []
+    for store in (False, True):
+        se = SearchEngine('depth_first', 'path')
+        if store:
+            se.node_store_on()
+        result = se.solve(s, rushhour_goal_fn)
+        store_results.append((result.cost, result.nodes_expanded, result.cycle_check_pruned))
+    if store_results[0] == store_results[1] and store_results[0][0] is not None:
+        print("\t Depth first search with path checking gives the same result with and without a node store.")
+        totalTests += 1
+    else:
+        print("\t ERROR: (cost, nodes expanded, states pruned) should be the same with and without a node store.")
+        print("\t They were %s and %s" % (store_results[0], store_results[1]))
+
+    print("--------------------------------")
+    print("Now testing external memory search of a space that isn't reversible:")
+    #the same space, but duplicates are detected against every layer
+    class rushhour_one_way(rushhour):
+        reversible = False
+    s_one_way = rushhour_one_way(s.action, s.gval, None, s.problem, s.positions)
+    external_counts = []
+    for state in (s, s_one_way):
+        se = SearchEngine('external_breadth_first')
+        se.set_external_memory(run_size = 64)
+        result = se.solve(state, lambda state: False)
+        external_counts.append(result.nodes_expanded)
+    if external_counts[0] == external_counts[1] and external_counts[0] > 1:
+        print("\t Both searches expanded the %d reachable states once." % external_counts[0])
+        totalTests += 1
+    else:
+        print("\t ERROR: The searches should expand the same reachable states.")
+        print("\t They expanded %d and %d states" % (external_counts[0], external_counts[1]))
+
+    print("--------------------------------")
+    print("Now testing a pattern database:")
+    pdb_dir = tempfile.mkdtemp()
+    pdb = build_pattern_database(s, ['1'], os.path.join(pdb_dir, 'gv_1.rhdt'))
+    pdb_values = (pdb(s), sorted(pdb(succ) for succ in s.successors()))
+    #a PDB of another vehicle set is refused on first use
+    s_other = make_init_state((7, 7), vehicle_list[:2], (4, 1), 'E')
+    pdb_other = pattern_database(os.path.join(pdb_dir, 'gv_1.rhdt'))
+    try:
+        pdb_other(s_other)
+        refused = False
+    except ValueError:
+        refused = True
+    pdb.close()
+    pdb_other.close()
+    shutil.rmtree(pdb_dir)
+    if pdb_values == (3, [2, 3, 3, 3, 4]) and refused:
+        print("\t The pattern database of gv and 1 gives 3 for s and is refused for another vehicle set.")
+        totalTests += 1
+    else:
+        print("\t ERROR: The pattern database should give 3 for s and [2, 3, 3, 3, 4] for its successors,")
+        print("\t and raise ValueError for a board with another vehicle set.")
+        print("\t It gave %s, refused: %s" % (pdb_values, refused))
+
+    print("--------------------------------")
+    print("Now testing that move pruning keeps the optimal solution costs:")
+    #searches that drop a state reached again at the same cost keep only
+    #the first path to it, and with it the moves pruned after that path
+    pruning_boards = [((6, 6), [['gv', (2, 3), 2, False, True], ['1', (0, 4), 2, True, False], ['2', (0, 2), 3, True, False],
+                                ['3', (4, 2), 2, True, False], ['4', (3, 5), 3, True, False], ['5', (0, 5), 3, False, False],
+                                ['6', (1, 0), 3, True, False], ['7', (5, 3), 2, False, False], ['8', (3, 3), 2, True, False],
+                                ['9', (5, 0), 2, False, False], ['10', (3, 1), 2, False, False]], (2, 1), 'S'),
+                      ((6, 6), [['gv', (5, 2), 2, True, True], ['1', (5, 4), 2, False, False], ['2', (3, 0), 3, True, False],
+                                ['3', (1, 2), 2, False, False], ['4', (1, 4), 2, True, False], ['5', (4, 3), 3, True, False],
+                                ['6', (3, 4), 2, False, False], ['7', (1, 0), 2, True, False], ['8', (2, 1), 3, False, False],
+                                ['9', (0, 5), 2, False, False], ['10', (4, 1), 2, False, False]], (3, 2), 'E')]
+    pruning_errors = []
+    for (size, vehicles, entrance, direction) in pruning_boards:
+        costs = {}
+        for strategy in ('astar', 'anytime_astar', 'parallel_astar', 'breadth_first_heuristic', 'bidirectional'):
+            for prune in (True, False):
+                se = SearchEngine(strategy, 'full')
+                if strategy == 'parallel_astar':
+                    se.set_workers(2)
+                s_pruning = make_init_state(size, vehicles, entrance, direction, prune_moves = prune)
+                costs[(strategy, prune)] = se.solve(s_pruning, rushhour_goal_fn, heur_blocking).cost
+        if len(set(costs.values())) != 1:
+            pruning_errors.append(costs)
+    if not pruning_errors:
+        print("\t Every strategy found the same costs with and without move pruning.")
+        totalTests += 1
+    else:
+        print("\t ERROR: The solution costs differ with and without move pruning:")
+        for costs in pruning_errors:
+            print("\t", costs)
+
+    print("--------------------------------")
+    print("Now testing a portfolio configuration that fails:")
+    try:
+        portfolio_search(s, rushhour_goal_fn, [('astar', 'full', heur_broken)], max_seconds = 30)
+        failure = None
+    except RuntimeError as e:
+        failure = e
+    if failure is not None and isinstance(failure.__cause__, KeyError):
+        print("\t portfolio_search raised the KeyError of the only configuration.")
+        totalTests += 1
+    else:
+        print("\t ERROR: portfolio_search should raise a RuntimeError caused by the KeyError of the heuristic.")
+        print("\t It raised %r" % failure)
+
+    print("--------------------------------")
+    print("Now testing a portfolio race of optimal configurations with parallel_astar:")
+    #the astar configuration fails, so only parallel_astar can win
+    (configuration, result) = portfolio_search(s, rushhour_goal_fn, [('parallel_astar', 'full', heur_blocking),
+                                                                     ('astar', 'full', heur_broken)],
+                                               optimal = True, max_seconds = 30)
+    if configuration == ('parallel_astar', 'full', heur_blocking) and result.cost == 3 and len(result.path) == 4:
+        print("\t parallel_astar won the race of optimal configurations with a solution of cost 3.")
+        totalTests += 1
+    else:
+        print("\t ERROR: parallel_astar should be raced with optimal = True and find a solution of cost 3.")
+        print("\t The race returned %s and %s" % (configuration, result and result.cost))
+
+    print("--------------------------------")
+    print("Now testing parallel_astar with 2 workers:")
+    before = forked_processes()
+    parallel_results = []
+    for max_seconds in (None, 30, 0):
+        se = SearchEngine('parallel_astar', 'full')
+        se.set_workers(2)
+        se.set_budget(max_seconds = max_seconds)
+        parallel_results.append(se.solve(s, rushhour_goal_fn, heur_blocking))
+    #a worker stalled when the budget runs out is terminated
+    se = SearchEngine('parallel_astar', 'full')
+    se.set_workers(2)
+    se.set_budget(max_seconds = 0.5)
+    stalled_result = se.solve(s, rushhour_goal_fn, heur_stalled)
+    parallel_left = forked_processes() - before
+    #the path must be replayable: each state a successor of the one before
+    parallel_paths_valid = True
+    for result in parallel_results[:2]:
+        path = result.path
+        if path[0].hashable_state() != s.hashable_state() or not rushhour_goal_fn(path[-1]):
+            parallel_paths_valid = False
+        for k in range(1, len(path)):
+            if path[k].hashable_state() not in [succ.hashable_state() for succ in path[k - 1].successors()]:
+                parallel_paths_valid = False
+    if ([result.cost for result in parallel_results] == [3, 3, None] and parallel_paths_valid and
+        parallel_results[1].budget_exhausted is None and parallel_results[2].budget_exhausted is not None and
+        stalled_result.budget_exhausted is not None and not parallel_left):
+        print("\t parallel_astar found a valid path of cost 3, within a 30 second budget too, and ran out of a 0 second budget.")
+        print("\t No worker was left running, even one stalled when the budget ran out.")
+        totalTests += 1
+    else:
+        print("\t ERROR: parallel_astar should find a valid path of cost 3 without a budget and with a 30 second budget,")
+        print("\t and exhaust a 0 second budget, and leave no worker running.")
+        print("\t It found costs %s, valid paths: %s, budgets exhausted: %s" % ([result.cost for result in parallel_results], parallel_paths_valid,
+                                                                              [result.budget_exhausted for result in parallel_results]))
+        print("\t The stalled search ran out of budget: %s, workers left: %s" % (stalled_result.budget_exhausted, sorted(parallel_left)))
+
+    print("--------------------------------")
+    print("Now testing idastar:")
+    idastar_costs = []
+    for (size, vehicles, entrance, direction) in [((7, 7), vehicle_list, goal_entrance, goal_orientation)] + pruning_boards:
+        s_idastar = make_init_state(size, vehicles, entrance, direction)
+        idastar_costs.append(tuple(SearchEngine(strategy).solve(s_idastar, rushhour_goal_fn, heur_blocking).cost
+                                   for strategy in ('astar', 'idastar')))
+    if all(astar_cost == idastar_cost and astar_cost is not None for (astar_cost, idastar_cost) in idastar_costs):
+        print("\t idastar found the same solution costs as astar.")
+        totalTests += 1
+    else:
+        print("\t ERROR: idastar should find the same solution costs as astar.")
+        print("\t The (astar, idastar) costs were %s" % idastar_costs)
+
+    print("--------------------------------")
+    print("Now testing the canonical mode of interchangeable vehicles:")
+    #vehicles 1 and 2 have the same length and lane, so they are
+    #interchangeable in canonical mode
+    canonical_keys = []
+    canonical_costs = []
+    for canonical in (False, True):
+        (s_12, s_21) = [make_init_state((7, 7), [['gv', (1, 1), 2, True, True], ['1', p1, 2, True, False], ['2', p2, 2, True, False]],
+                                        (4, 1), 'E', canonical = canonical)
+                        for (p1, p2) in (((0, 3), (3, 3)), ((3, 3), (0, 3)))]
+        canonical_keys.append((s_12.hashable_state() == s_21.hashable_state(), s_12.zobrist_hash() == s_21.zobrist_hash()))
+        canonical_costs.append(SearchEngine('astar', 'full').solve(s_12, rushhour_goal_fn, heur_blocking).cost)
+    if canonical_keys == [(False, False), (True, True)] and canonical_costs[0] == canonical_costs[1]:
+        print("\t Swapping interchangeable vehicles gives the same keys only in canonical mode, and the same cost.")
+        totalTests += 1
+    else:
+        print("\t ERROR: Swapped interchangeable vehicles should have the same hashable_state and zobrist_hash only in canonical mode.")
+        print("\t The (hashable_state, zobrist_hash) equalities were %s and the costs %s" % (canonical_keys, canonical_costs))
+
+    print("--------------------------------")
+    print("Now testing slides under both metrics:")
+    #a slide of k cells costs k under 'distance', so the optimal cost is
+    #that of single moves, and 1 under 'moves', so it is the fewest slides
+    (size, vehicles, entrance, direction) = pruning_boards[0]
+    moves_cost = SearchEngine('astar', 'full').solve(make_init_state(size, vehicles, entrance, direction), rushhour_goal_fn, heur_blocking).cost
+    s_distance = make_slide_init_state(size, vehicles, entrance, direction, metric = 'distance')
+    s_moves = make_slide_init_state(size, vehicles, entrance, direction, metric = 'moves')
+    slide_costs = (SearchEngine('astar', 'full').solve(s_distance, rushhour_goal_fn, heur_blocking).cost,
+                   SearchEngine('astar', 'full').solve(s_moves, rushhour_goal_fn, heur_slides).cost)
+    fewest_slides = len(SearchEngine('breadth_first', 'full').solve(s_distance, rushhour_goal_fn).path) - 1
+    if slide_costs == (moves_cost, fewest_slides) and slide_costs[1] < slide_costs[0]:
+        print("\t Slides cost %d under 'distance', as single moves do, and %d under 'moves', the fewest slides." % slide_costs)
+        totalTests += 1
+    else:
+        print("\t ERROR: Slides should cost %d under 'distance' and %d under 'moves'." % (moves_cost, fewest_slides))
+        print("\t They cost %s and %s" % slide_costs)
+
+    print("--------------------------------")
+    print("Now testing a distance table read back from its file:")
+    table_dir = tempfile.mkdtemp()
+    table_file = os.path.join(table_dir, 's.rhdt')
+    write_distance_table(s, table_file)
+    table = distance_table(table_file)
+    #every state reachable from s, with its breadth first distance to the goal
+    reachable = {s.hashable_state(): s}
+    stack = [s]
+    while stack:
+        for succ in stack.pop().unpruned_successors():
+            if succ.hashable_state() not in reachable:
+                reachable[succ.hashable_state()] = succ
+                stack.append(succ)
+    table_errors = []
+    for state in reachable.values():
+        #start from gval 0 and without the last move, which prunes moves
+        state = s.make_state('START', 0, None, state.positions)
+        cost = SearchEngine('breadth_first', 'full').solve(state, rushhour_goal_fn).cost
+        if table.distance(state) != (UNREACHABLE if cost is None else cost):
+            table_errors.append((state.hashable_state(), table.distance(state), cost))
+    table_path = table.solve(s)
+    table.close()
+    #a corrupt header, a truncated table and a table of another board are refused
+    with open(table_file, 'rb') as f:
+        table_data = f.read()
+    bad_files = {'header': table_data[:8] + b'x' * (len(table_data) - 8), 'truncated': table_data[:-1]}
+    refused = []
+    for (name, data) in bad_files.items():
+        with open(os.path.join(table_dir, name), 'wb') as f:
+            f.write(data)
+    for (name, state) in (('header', s), ('truncated', s), ('s.rhdt', make_init_state((7, 7), vehicle_list[:2], (4, 1), 'E'))):
+        try:
+            table = distance_table(os.path.join(table_dir, name))
+            try:
+                table.distance(state)
+            finally:
+                table.close()
+        except ValueError:
+            refused.append(name)
+    #s at distance 6, while none of its successors is at distance 5
+    table = distance_table(table_file)
+    table_offset = table.offset
+    table.close()
+    with open(table_file, 'r+b') as f:
+        f.seek(table_offset + state_rank(s.problem, s.positions))
+        f.write(bytes([6]))
+    table = distance_table(table_file)
+    try:
+        table.solve(s)
+    except ValueError:
+        refused.append('inconsistent')
+    table.close()
+    shutil.rmtree(table_dir)
+    if not table_errors and len(reachable) > 1 and len(table_path) == 4 and refused == ['header', 'truncated', 's.rhdt', 'inconsistent']:
+        print("\t The table read back gives the breadth first distance of all %d states reachable from s." % len(reachable))
+        print("\t Its files with a corrupt header, truncated distances or another vehicle set are refused,")
+        print("\t and solve() refuses a table inconsistent with the moves.")
+        totalTests += 1
+    else:
+        print("\t ERROR: The table read back should give the breadth first distances and a path of 3 moves from s,")
+        print("\t and its corrupt, truncated, mismatched and inconsistent files should raise ValueError.")
+        print("\t (state, table distance, breadth first cost) differ for %s, the path has %d states and %s were refused" % (table_errors, len(table_path), refused))
+
+    print("--------------------------------")
+    print("Now testing a pattern database read back from its file:")
+    pdb_dir = tempfile.mkdtemp()
+    pdb_file = os.path.join(pdb_dir, 'gv_3.rhdt')
+    build_pattern_database(s, ['3'], pdb_file).close()
+    #a copy sent to another process reopens the file by name
+    pdb = pickle.loads(pickle.dumps(pattern_database(pdb_file)))
+    pdb_errors = []
+    for state in reachable.values():
+        #the abstract board of the pattern keeps only gv and 3
+        statuses = [vs for vs in state.get_vehicle_statuses() if vs[0] in ('gv', '3')]
+        abstract_state = make_init_state((7, 7), statuses, (4, 1), 'E')
+        cost = SearchEngine('breadth_first', 'full').solve(abstract_state, rushhour_goal_fn).cost
+        if pdb(state) != (UNREACHABLE if cost is None else cost):
+            pdb_errors.append((state.hashable_state(), pdb(state), cost))
+    pdb.close()
+    with open(pdb_file, 'rb') as f:
+        pdb_data = f.read()
+    with open(pdb_file, 'wb') as f:
+        f.write(pdb_data[:-1])
+    pdb_truncated = pattern_database(pdb_file)
+    try:
+        pdb_truncated(s)
+        refused = False
+    except ValueError:
+        refused = True
+    pdb_truncated.close()
+    shutil.rmtree(pdb_dir)
+    if not pdb_errors and refused:
+        print("\t The PDB read back gives the distances on the board of gv and 3 of all %d states reachable from s." % len(reachable))
+        print("\t Its truncated file is refused.")
+        totalTests += 1
+    else:
+        print("\t ERROR: The PDB read back should give the breadth first distances on the board of gv and 3,")
+        print("\t and its truncated file should raise ValueError.")
+        print("\t (state, PDB distance, breadth first cost) differ for %s, refused: %s" % (pdb_errors, refused))
+
+    print("--------------------------------")
+    print("Now testing that a race leaves no processes behind:")
+    before = forked_processes()
+    (configuration, result) = portfolio_search(s, rushhour_goal_fn, [('astar', 'full', heur_delayed),
+                                                                     ('parallel_astar', 'full', heur_stalled)])
+    time.sleep(0.5)
+    left = forked_processes() - before
+    if configuration == ('astar', 'full', heur_delayed) and not left:
+        print("\t astar won and the workers of the losing parallel_astar configuration were stopped.")
+        totalTests += 1
+    else:
+        print("\t ERROR: astar should win the race and no process of the parallel_astar configuration should be left.")
+        print("\t The race returned %s, and processes %s were left" % (configuration, sorted(left)))
+        for pid in left:
+            os.kill(pid, signal.SIGKILL)
+
+    print("--------------------------------")
+    print("Now testing a portfolio race won by a solution found before the budget ran out:")
+    #anytime_astar finds a solution within the 90 fast calls of heur_tiring,
+    #but can't prove it optimal within the budget
+    (size, vehicles, entrance, direction) = pruning_boards[0]
+    s_tiring = make_init_state(size, vehicles, entrance, direction)
+    races = [portfolio_search(s_tiring, rushhour_goal_fn, [('anytime_astar', 'full', heur_tiring)], optimal = optimal, max_seconds = 0.3)
+             for optimal in (False, True)]
+    ((configuration, result), optimal_race) = races
+    if result is not None and result.solved and result.budget_exhausted and len(result.path) == result.cost + 1 and optimal_race == (None, None):
+        print("\t The best solution so far of anytime_astar is accepted only when optimal is False.")
+        totalTests += 1
+    else:
+        print("\t ERROR: The solution of anytime_astar found before its budget ran out should be returned only when optimal is False.")
+        print("\t The races returned %s and %s" % (races[0][1] and (races[0][1].cost, races[0][1].budget_exhausted), optimal_race))
+
+    print("--------------------------------")
+    print("Now testing the original rushhour constructor:")
+    s_original = rushhour('START', 0, None, vehicle_list, board_properties)
+    original_successors = sorted(sorted(succ.vehicle_list) for succ in s_original.successors())
+    if (s_original.vehicle_list == vehicle_list and s_original.board_properties == board_properties and
+        original_successors == sorted(sorted(succ.vehicle_list) for succ in s.successors()) and
+        SearchEngine('astar', 'full').solve(s_original, rushhour_goal_fn, heur_blocking).cost == 3):
+        print("\t rushhour(action, gval, parent, vehicle_list, board_properties) gives the state of make_init_state.")
+        totalTests += 1
+    else:
+        print("\t ERROR: rushhour('START', 0, None, vehicle_list, board_properties) should give the state of make_init_state.")
+        print("\t Its vehicle_list is %s and its successors %s" % (s_original.vehicle_list, original_successors))
+
+    print("--------------------------------")
+    print("Now testing breadth first heuristic search from states with a last move:")
+    #the last move of a successor prunes some of its moves, which must not
+    #stop the searches from it (and from relay nodes) finding the optimal cost
+    bfhs_costs = []
+    for succ in s.successors():
+        fresh = s.make_state('START', 0, None, succ.positions)
+        bfhs_costs.append((SearchEngine('breadth_first_heuristic', 'full').solve(succ, rushhour_goal_fn).cost - succ.gval,
+                           SearchEngine('breadth_first', 'full').solve(fresh, rushhour_goal_fn).cost))
+    if all(bfhs_cost == cost for (bfhs_cost, cost) in bfhs_costs):
+        print("\t breadth_first_heuristic found the optimal cost from every successor of s.")
+        totalTests += 1
+    else:
+        print("\t ERROR: breadth_first_heuristic should find the optimal cost from every successor of s.")
+        print("\t The (breadth_first_heuristic, optimal) costs were %s" % bfhs_costs)
+
+    print("--------------------------------")
+    print("Now testing zobrist hashing for full cycle checking:")
+    (size, vehicles, entrance, direction) = pruning_boards[0]
+    s_zobrist = make_init_state(size, vehicles, entrance, direction)
+    zobrist_results = {}
+    for strategy in ('breadth_first', 'best_first', 'astar'):
+        for mode in ('off', 'on', 'verify'):
+            se = SearchEngine(strategy, 'full')
+            if mode != 'off':
+                se.zobrist_on(verify = mode == 'verify')
+            result = se.solve(s_zobrist, rushhour_goal_fn, heur_blocking)
+            zobrist_results[(strategy, mode)] = (result.cost, result.nodes_expanded, result.nodes_generated)
+    zobrist_errors = [strategy for strategy in ('breadth_first', 'best_first', 'astar')
+                      if len(set(zobrist_results[(strategy, mode)] for mode in ('off', 'on', 'verify'))) != 1]
+    if not zobrist_errors:
+        print("\t Each strategy found the same cost and node counts with zobrist hashing off, on and verified.")
+        totalTests += 1
+    else:
+        print("\t ERROR: The (cost, nodes expanded, nodes generated) should not depend on zobrist hashing.")
+        print("\t They differ for %s: %s" % (zobrist_errors, zobrist_results))
+
+    print("--------------------------------")
+    print("Now testing zobrist hash collisions with verification:")
+    se = SearchEngine('astar', 'full')
+    se.zobrist_on(verify = True)
+    result = se.solve(colliding_state('START', 0, None, s_zobrist), lambda state: rushhour_goal_fn(state.state),
+                      lambda state: heur_blocking(state.state))
+    if result.cost == zobrist_results[('astar', 'off')][0] and se.zobrist_collisions > 0:
+        print("\t astar found the optimal cost %d despite %d zobrist collisions." % (result.cost, se.zobrist_collisions))
+        totalTests += 1
+    else:
+        print("\t ERROR: astar with verified zobrist hashing should find the optimal cost %d despite collisions." % zobrist_results[('astar', 'off')][0])
+        print("\t It found cost %s with %d collisions" % (result.cost, se.zobrist_collisions))
+
+    print("--------------------------------")
+    print("Now testing the tie breaking of the best_first and astar OPEN:")
+    #items pushed with (gval, hval): ties on the key go to the greater
+    #gval, then to the item pushed first
+    pushes = [('d', 0, 2), ('a', 1, 2), ('b', 2, 1), ('c', 2, 1), ('e', 3, 0)]
+    open_orders = []
+    for strategy in ('best_first', 'astar'):
+        OPEN = Open(SearchEngine(strategy).strategy)
+        for (item, gval, hval) in pushes:
+            OPEN.push(item, gval, hval)
+        open_orders.append(''.join(OPEN.extract() for i in range(len(pushes))))
+    if open_orders == ['ebcad', 'debca']:
+        print("\t best_first extracted ebcad and astar debca.")
+        totalTests += 1
+    else:
+        print("\t ERROR: best_first should extract ebcad and astar debca.")
+        print("\t They extracted %s and %s" % tuple(open_orders))
+
+    print("--------------------------------")
+    print("Now testing the bucket OPEN against the priority queue:")
+    rand = random.Random(0)
+    pushes = [(rand.randint(0, 20), rand.randint(0, 20)) for i in range(500)]
+    bucket_orders = []
+    for strategy in ('best_first', 'astar'):
+        orders = []
+        for buckets in (True, False):
+            OPEN = Open(SearchEngine(strategy).strategy, buckets)
+            for (gval, hval) in pushes:
+                OPEN.push((gval, hval), gval, hval)
+            #the nodes come out in the same order of keys, ties between
+            #equal keys aside
+            if strategy == 'best_first':
+                orders.append([OPEN.extract()[1] for i in range(len(pushes))])
+            else:
+                orders.append([(gval + hval, gval) for (gval, hval) in (OPEN.extract() for i in range(len(pushes)))])
+            orders.append(OPEN.empty())
+        bucket_orders.append(orders[0] == orders[2] and orders[1] and orders[3])
+    #the g-stacks of an f-bucket are kept only for the gvals on OPEN
+    OPEN = Open(SearchEngine('astar').strategy, True)
+    OPEN.push('x', 9, 1)
+    sparse = len(OPEN.open[10]) == 1
+    bucket_costs = []
+    for (size, vehicles, entrance, direction) in [((7, 7), vehicle_list, goal_entrance, goal_orientation)] + pruning_boards:
+        s_buckets = make_init_state(size, vehicles, entrance, direction)
+        costs = []
+        for buckets in (True, False):
+            se = SearchEngine('astar', 'full')
+            if not buckets:
+                se.buckets_off()
+            costs.append(se.solve(s_buckets, rushhour_goal_fn, heur_blocking).cost)
+        bucket_costs.append(costs)
+    if bucket_orders == [True, True] and sparse and all(costs[0] == costs[1] is not None for costs in bucket_costs):
+        print("\t The buckets give the order of keys of the priority queue, and astar the same costs with both.")
+        totalTests += 1
+    else:
+        print("\t ERROR: The buckets should give the keys in the order of the priority queue, and astar the same costs with both.")
+        print("\t Same orders for best_first and astar: %s, sparse g-stacks: %s, costs with and without buckets: %s" % (bucket_orders, sparse, bucket_costs))
+
+    print("--------------------------------")
+    print("Now testing the bucket OPEN with keys that aren't small integers:")
+    fallbacks = []
+    for (strategy, hval) in (('best_first', 0.5), ('best_first', -1), ('astar', 0.5), ('astar', 10 ** 9)):
+        OPEN = Open(SearchEngine(strategy).strategy, True)
+        for (gval, h) in ((1, 3), (2, 1), (0, 2)):
+            OPEN.push((gval, h), gval, h)
+        OPEN.push((1, hval), 1, hval)
+        if strategy == 'best_first':
+            keys = [OPEN.extract()[1] for i in range(4)]
+        else:
+            keys = [gval + h for (gval, h) in (OPEN.extract() for i in range(4))]
+        fallbacks.append(not OPEN.buckets and keys == sorted(keys) and OPEN.empty())
+    weighted_costs = []
+    for buckets in (True, False):
+        se = SearchEngine('weighted_astar', 'full')
+        se.set_weight(1.5)
+        if not buckets:
+            se.buckets_off()
+        result = se.solve(make_init_state(*pruning_boards[0]), rushhour_goal_fn, heur_blocking)
+        weighted_costs.append((result.cost, result.nodes_expanded))
+    if fallbacks == [True] * 4 and weighted_costs[0] == weighted_costs[1]:
+        print("\t A fractional, negative or huge key turns the buckets into a priority queue keeping the nodes in order.")
+        totalTests += 1
+    else:
+        print("\t ERROR: A key that isn't a small non-negative integer should turn the buckets into a priority queue.")
+        print("\t Fallbacks that kept the order: %s, weighted_astar (cost, nodes expanded) with and without buckets: %s" % (fallbacks, weighted_costs))
+
+    print("--------------------------------")
+    print("Now testing two engines searching at the same time in threads:")
+    thread_problems = [(SearchEngine('astar', 'full'), make_init_state(*pruning_boards[0])),
+                       (SearchEngine('best_first', 'full'), make_init_state(*pruning_boards[1]))]
+    sequential_counts = []
+    for (se, state) in thread_problems:
+        result = se.solve(state, rushhour_goal_fn, heur_blocking)
+        sequential_counts.append((result.cost, result.nodes_expanded, result.states_generated))
+    thread_counts = [None, None]
+    def thread_solve(k):
+        (se, state) = thread_problems[k]
+        #repeat the search so that the threads overlap
+        for i in range(20):
+            result = se.solve(state, rushhour_goal_fn, heur_blocking)
+            if thread_counts[k] is None or thread_counts[k] == (result.cost, result.nodes_expanded, result.states_generated):
+                thread_counts[k] = (result.cost, result.nodes_expanded, result.states_generated)
+            else:
+                thread_counts[k] = 'changed'
+    threads = [threading.Thread(target = thread_solve, args = (k,)) for k in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if thread_counts == sequential_counts:
+        print("\t Each engine counted the same nodes in a thread as when searching alone.")
+        totalTests += 1
+    else:
+        print("\t ERROR: The (cost, nodes expanded, states generated) of each engine should be the same in threads as alone.")
+        print("\t They were %s alone and %s in threads" % (sequential_counts, thread_counts))
+
+    print("--------------------------------")
+    print("Now testing the best node of a search without a budget:")
+    #no state is a goal, so the search expands every state reachable from s
+    best_hvals = []
+    for strategy in ('astar', 'idastar'):
+        result = SearchEngine(strategy, 'full').solve(s, lambda state: False, heur_blocking)
+        best_hvals.append(result.best_node and result.best_node.hval)
+    if best_hvals == [0, 0]:
+        print("\t astar and idastar failed with a best node of hval 0.")
+        totalTests += 1
+    else:
+        print("\t ERROR: astar and idastar should fail with a best node of hval 0 without a budget.")
+        print("\t Their best nodes had hvals %s" % best_hvals)
+
     print("--------------------------------")
     if(totalTests == passingMark):
         print("All tests passed. Good job!")
@@ -1,430 +1,2193 @@
-'''Search routines.
-   A) Class StateSpace
-
-      An abstract base class for representing the states in a search
-      space.  Each state has a pointer to the parent that was used to
-      generate it, and the cost of g-value of the sequence of actions
-      that was used to generate it.
-
-      Equivalent states can be reached via different paths, so to
-      avoid exploring the same state multiple times the search
-      routines employ cycle checking using hashing techniques. Hence,
-      each StateSpace state (or object) must be able to return an
-      immutable representation that uniquely represents the state and
-      can be used to index into a dictionary.
-
-      The StateSpace class must be specialized for the particular problem. Each
-      particular problem will define a subclass of StateSpace that will also
-      include information specific to that problem. See WaterJugs.py for an
-      example, and the Class implementation for more details.
-
-
-    B) class SearchEngine
-
-      objects of this class define the search routines. They utilize
-      two auxiliary classes (1) Class sNode---the objects of this class
-      are used to represent nodes in the search space (these nodes
-      contain problem states, i.e., StateSpace objects but they are
-      search nodes not states of the state space.  (2) Class
-      Open---these objects are used to store the set of unexpanded
-      nodes. These objects are search strategy specific. For example,
-      Open is implemented as a stack when doing depth-first search, as
-      a priority queue when doing astar search etc.
-
-      The main routines that the user will employ are in the SearchEngine class.
-      These include the ability to set the search strategy, and to invoke
-      search (using the search method). See the implementation for details. 
-
-    '''
-import heapq
-from collections import deque
-import os
-
-
-class StateSpace:
-    '''Abstract class for defining State spaces for search routines'''
-    n = 0
-    
-    def __init__(self, action, gval, parent):
-        '''Problem specific state space objects must always include the data items
-           a) self.action === the name of the action used to generate
-              this state from parent. If it is the initial state a good
-              convention is to supply the action name "START"
-           b) self.gval === a number (integer or real) that is the cost
-              of getting to this state.
-           c) parent the state from which this state was generated (by
-              applying "action"
-        '''
-        self.action = action
-        self.gval = gval
-        self.parent = parent
-        self.index = StateSpace.n
-        StateSpace.n = StateSpace.n + 1
-
-    def successors(self):
-        '''This method when invoked on a state space object must return a
-           list of successor states, each with the data items "action"
-           the action used to generate this successor state, "gval" the
-           gval of self plus the cost of the action, and parent set to self.
-           Also any problem specific data must be specified property.'''
-        
-        print("Must be over ridden.")
-
-    def hashable_state(self):
-        '''This method must return an immutable and unique representation
-           of the state represented by self. The return value, e.g., a
-           string or tuple, will be used by hashing routines. So if obj1 and
-           obj2, both StateSpace objects then obj1.hashable_state() == obj2.hashable_state()
-           if and only if obj1 and obj2 represent the same problem state.'''
-
-        print("Must be over ridden.")
-
-    def print_state(self):
-        '''Print a representation of the state'''
-        print("Must be over ridden.")
-
-    def print_path(self):
-        '''print the sequence of actions used to reach self'''
-        #can be over ridden to print problem specific information
-        s = self
-        states = []
-        while s:
-            states.append(s)
-            s = s.parent
-        states.pop().print_state()
-        while states:
-            print(" ==> ", end="")
-            states.pop().print_state()
-        print("")
- 
-    def has_path_cycle(self):
-        '''Returns true if self is equal to a prior state on its path'''
-        s = self.parent
-        hc = self.hashable_state()
-        while s:
-            if s.hashable_state() == hc:
-                return True
-            s = s.parent
-        return False
-
-#Constants to denote the search strategy. 
-_DEPTH_FIRST = 0
-_BREADTH_FIRST = 1
-_BEST_FIRST = 2
-_ASTAR = 3
-
-#For best first and astar we use a priority queue. This requires
-#a comparison function for nodes. These constants indicate if we use
-#the gval, the hval or the sum of gval and hval in the comparison.
-_SUM_HG = 0
-_H = 1
-_G = 2
-
-#Cycle Checking. Either CC_NONE 'none' (no cycle checking), CC_PATH
-#'path' (path checking only) or CC_FULL 'full' (full cycle checking,
-#remembering all previously visited nodes).
-
-_CC_NONE = 0
-_CC_PATH = 1
-_CC_FULL = 2
-
-#Zero Heuristic Function---for uninformed search don't include heur_fn
-#in call to search engine's search method, defaults heur_fn to the zero fn.
-def _zero_hfn(state):
-    '''Null heuristic (zero)'''
-    return 0
-
-class sNode:
-    '''Object of this class form the nodes of the search space.  Each
-    node consists of a search space object (determined by the problem
-    definition) along with the h and g values (the g values is
-    redundant as it is stored in the state, but we make a copy in the
-    node object for convenience), and a the number of the node'''
-    
-    n = 0
-    lt_type = _SUM_HG
-    
-    def __init__(self, state, hval):
-        self.state = state
-        self.hval = hval
-        self.gval = state.gval
-        self.index = sNode.n
-        sNode.n = sNode.n + 1
-
-    def __lt__(self, other):
-        '''For astar and best first we muse a priority queue for the
-           OPEN set. This queue stores search nodes waiting to be
-           expanded. Thus we need to define a node1 < node2 function
-           by defining the __lt__ function. Dependent on the type of
-           search this comparison function compares the h-value, the
-           g-value or the f-value of the nodes. Note for the f-value
-           we wish to break ties by letting node1 < node2 if they both
-           have identical f-values but if node1 has a GREATER g
-           value. This means that we expand nodes along deeper paths
-           first causing the search to proceed directly to the goal'''
-        
-        if sNode.lt_type == _SUM_HG:
-            if (self.gval+self.hval) == (other.gval+other.hval):
-                #break ties by greatest gval. 
-                return self.gval > other.gval
-            else: return ((self.gval+self.hval) < (other.gval+other.hval))
-        if sNode.lt_type == _G:
-            return self.gval < other.gval
-        if sNode.lt_type == _H:
-            return self.hval < other.hval
-        print('sNode class has invalid comparator setting!')
-        #return default of lowest gval (generating breadth first behavior)
-        return self.gval < other.gval
-
-class Open:
-    '''Open objects hold the search frontier---the set of unexpanded
-       nodes. Depending on the search strategy used we want to extract
-       nodes from this set in different orders, so set up the object's
-       functions to operate as needed by the particular search
-       strategy'''
-    
-    def __init__(self, search_strategy):
-        if search_strategy == _DEPTH_FIRST:
-            #use stack for OPEN set (last in---most recent successor
-            #added---is first out)
-            self.open = []
-            self.insert = self.open.append
-            self.extract = self.open.pop
-        elif search_strategy == _BREADTH_FIRST:
-            #use queue for OPEN (first in---earliest node not yet
-            #expanded---is first out)
-            self.open = deque()
-            self.insert = self.open.append
-            self.extract = self.open.popleft
-        elif search_strategy == _BEST_FIRST:
-            #use priority queue for OPEN (first out is node with
-            #lowest hval)
-            self.open = []
-            #set node less than function to compare hvals only
-            sNode.lt_type = _H
-            self.insert = lambda node: heapq.heappush(self.open, node)
-            self.extract = lambda: heapq.heappop(self.open)
-        elif search_strategy == _ASTAR:
-            #use priority queue for OPEN (first out is node with
-            #lowest fval = gval+hval)
-            self.open = []
-            #set node less than function to compare sums of hval and gval
-            sNode.lt_type = _SUM_HG
-            self.insert = lambda node: heapq.heappush(self.open, node)
-            self.extract = lambda: heapq.heappop(self.open)
-
-    def empty(self): return not self.open
-
-    def print_open(self):
-        print("{", end="")
-        if len(self.open) == 1: 
-            print("   <S{}:{}:{}, g={}, h={}, f=g+h={}>".format(self.open[0].state.index, self.open[0].state.action, self.open[0].state.hashable_state(), self.open[0].gval, self.open[0].hval, self.open[0].gval+self.open[0].hval), end="")
-        else:
-            for nd in self.open:
-                print("   <S{}:{}:{}, g={}, h={}, f=g+h={}>".format(nd.state.index, nd.state.action, nd.state.hashable_state(), nd.gval, nd.hval, nd.gval+nd.hval), end="")
-        print("}")
-
-class SearchEngine:
-    def __init__(self, strategy = 'depth_first', cc_level = 'default'):
-        self.set_strategy(strategy, cc_level)
-        self.trace = 0
-
-    def initStats(self):
-        sNode.n = 0
-        StateSpace.n = 1    #initial state already generated on call so search
-        self.total_search_time = 0
-        self.cycle_check_pruned = 0
-        self.total_search_time = os.times()[0]
-
-    def trace_on(self, level = 1):
-        '''For debugging, set tracking level 1 or 2'''
-        self.trace = level
-
-    def trace_off(self):
-        '''Turn off tracing'''
-        self.trace = 0
-
-    def set_strategy(self, s, cc = 'default'):
-        if not s in ['depth_first', 'breadth_first', 'best_first', 'astar']:
-            print('Unknown search strategy specified:', s)
-            print("Must be one of 'depth_first', 'breadth_first', 'best_first', or 'astar'")
-        elif not cc in ['default', 'none', 'path', 'full']:
-            print('Unknown cycle check level', cc)
-            print( "Must be one of ['default', 'none', 'path', 'full']")
-
-        else:
-            if cc == 'default' :
-                if s == 'depth_first' :
-                    self.cycle_check = _CC_PATH
-                else:
-                    self.cycle_check = _CC_FULL
-            elif cc == 'none': self.cycle_check = _CC_NONE
-            elif cc == 'path': self.cycle_check = _CC_PATH
-            elif cc == 'full': self.cycle_check = _CC_FULL
-
-            if   s == 'depth_first'  : self.strategy = _DEPTH_FIRST
-            elif s == 'breadth_first': self.strategy = _BREADTH_FIRST
-            elif s == 'best_first'   : self.strategy = _BEST_FIRST
-            elif s == 'astar'        : self.strategy = _ASTAR
-
-    def get_strategy(self):
-        if   self.strategy == _DEPTH_FIRST    : rval = 'depth_first'
-        elif self.strategy == _BREADTH_FIRST  : rval = 'breadth_first'
-        elif self.strategy == _BEST_FIRST     : rval = 'best_first' 
-        elif self.strategy == _ASTAR          : rval = 'astar'
-
-        rval = rval + ' with '
-
-        if   self.cycle_check == _CC_NONE : rval = rval + 'no cycle checking'
-        elif self.cycle_check == _CC_PATH : rval = rval + 'path checking'
-        elif self.cycle_check == _CC_FULL : rval = rval + 'full cycle checking'
-
-        return rval
-
-    def search(self, initState, goal_fn, heur_fn = _zero_hfn):
-        #Perform full cycle checking as follows
-        #a. check state before inserting into OPEN. If we had already reached
-        #   the same state via a cheaper path, don't insert into OPEN.
-        #b. Sometimes we find a new cheaper path to a state (after the older
-        #   more expensive path to the state has already been inserted.
-        #   We deal with this lazily. We check states extracted from OPEN
-        #   and if we have already expanded that state via a cheaper path
-        #   we don't expand it. If we had expanded the state via a more
-        #   expensive path, we re-expand it.
-     
-    ###INIT the Search
-        self.initStats()
-
-        #BEGIN TRACING
-        if self.trace:
-            print("   TRACE: Search Strategy: ", self.get_strategy())
-            print("   TRACE: Initial State:", end="")
-            initState.print_state()
-        #END TRACING
-
-        OPEN = Open(self.strategy)
-        
-        node = sNode(initState, heur_fn(initState))
-
-        #the cycle check dictionary stores the cheapest path (g-val) found
-        #so far to a state. 
-        if self.cycle_check == _CC_FULL:
-            self.cc_dictionary = dict() 
-            self.cc_dictionary[initState.hashable_state()] = initState.gval
-        OPEN.insert(node)
-
-    ###NOW do the search and return the result
-        goal_node = self.searchOpen(OPEN, goal_fn, heur_fn)
-        if goal_node:
-            print("Search Successful!")
-            print("   Strategy = '{}'".format(self.get_strategy()))
-            print("   Solution cost = {}".format(goal_node.gval))
-            print("   Goal state: ", end="")
-            goal_node.state.print_state()
-            print("----------------------------")
-            print("Solution Path:")
-            goal_node.state.print_path()
-            self.total_search_time = os.times()[0] - self.total_search_time
-            print("----------------------------")
-            print("Search time = {}, nodes expanded = {}, states generated = {}, states cycle check pruned = {}".format(self.total_search_time,sNode.n, StateSpace.n, self.cycle_check_pruned))
-            return goal_node.state
-        else:
-        #exited the while without finding goal---search failed
-            print("Search Failed! (strategy '{}') No solution found".format(self.get_strategy()))
-            self.total_search_time = os.times()[0] - self.total_search_time
-            print("----------------------------")
-            print("Search time = {}, nodes expanded = {}, states generated = {}, states cycle check pruned = {}".format(self.total_search_time,sNode.n, StateSpace.n, self.cycle_check_pruned))
-            return False
-
-    def searchOpen(self, OPEN, goal_fn, heur_fn):
-        '''Open has some nodes on it, now search from that state of OPEN'''
-
-        #BEGIN TRACING
-        if self.trace:
-            print("   TRACE: Initial OPEN: ", OPEN.print_open())
-            if self.cycle_check == _CC_FULL:
-                print("   TRACE: Initial CC_Dict:", self.cc_dictionary)
-        #END TRACING
-
-        while not OPEN.empty():
-            node = OPEN.extract()
-
-            #BEGIN TRACING
-            if self.trace:
-                print("   TRACE: Next State to expand: <S{}:{}:{}, g={}, h={}, f=g+h={}>".format(node.state.index, node.state.action, node.state.hashable_state(), node.gval, node.hval, node.gval+node.hval))
-                if node.state.gval != node.gval:
-                    print("ERROR: Node gval not equal to state gval!")
-            #END TRACING
-                        
-            if goal_fn(node.state):
-                #node at front of OPEN is a goal...search is completed.
-                return node
-
-             #All states reached by a search node on OPEN have already
-             #been hashed into the self.cc_dictionary. However,
-             #before expanding a node we might have already expanded
-             #an equivalent state with lower g-value. So only expand
-             #the node if the hashed g-value is no greater than the
-             #node's current g-value. 
-
-            #BEGIN TRACING
-            if self.trace:
-                if self.cycle_check == _CC_FULL: print("   TRACE: CC_dict gval={}, node.gval={}".format(self.cc_dictionary[node.state.hashable_state()], node.gval))
-            #END TRACING
-
-            if self.cycle_check == _CC_FULL and self.cc_dictionary[node.state.hashable_state()] < node.gval:
-                continue
-
-            successors = node.state.successors()
-
-            #BEGIN TRACING
-            if self.trace:
-                print("   TRACE: Expanding Node. Successors = {", end="")
-                for ss in successors:
-                    print("<S{}:{}:{}, g={}, h={}, f=g+h={}>, ".format(ss.index, ss.action, ss.hashable_state(), ss.gval, heur_fn(ss), ss.gval+heur_fn(ss)), end="")
-                print("}")
-            #END TRACING
-
-            for succ in successors:
-                hash_state = succ.hashable_state()
-
-                #BEGIN TRACING
-                if self.trace > 1:
-                    print("   TRACE: Successor State:", end="")
-                    print("<S{}:{}:{}, g={}, h={}, f=g+h={}>, ".format(succ.index, ss.action, succ.hashable_state(), succ.gval, heur_fn(succ), succ.gval+heur_fn(succ)), end="")
-                    if self.cycle_check == _CC_FULL and hash_state in self.cc_dictionary:
-                        print("   TRACE: Already in CC_dict, CC_dict gval={}, successor state gval={}".format(self.cc_dictionary[hash_state], succ.gval))
-                    if self.cycle_check == _CC_PATH and succ.has_path_cycle():
-                        print("   TRACE: On cyclic path")
-                #END TRACING
-
-                prune_succ = (self.cycle_check == _CC_FULL and
-                              hash_state in self.cc_dictionary and
-                              succ.gval > self.cc_dictionary[hash_state]
-                             ) or (
-                              self.cycle_check == _CC_PATH and
-                              succ.has_path_cycle()
-                             )
-
-                if prune_succ :
-                    self.cycle_check_pruned = self.cycle_check_pruned + 1
-                    #BEGIN TRACING
-                    if self.trace > 1:
-                        print(" TRACE: Successor State pruned by cycle checking")
-                    #END TRACING
-                    continue
-
-                #passed all cycle checks...add to open
-                OPEN.insert(sNode(succ, heur_fn(succ)))
-                #BEGIN TRACING
-                if self.trace > 1:
-                    print(" TRACE: Successor State added to OPEN")
-                #END TRACING
-
-                #record cost of this path in dictionary.
-                if self.cycle_check == _CC_FULL:
-                    self.cc_dictionary[hash_state] = succ.gval
-
-        #end of while--OPEN is empty and no solution
-        return False
-            
+'''Search routines.
+   A) Class StateSpace
+
+      An abstract base class for representing the states in a search
+      space.  Each state has a pointer to the parent that was used to
+      generate it, and the cost of g-value of the sequence of actions
+      that was used to generate it.
+
+      Equivalent states can be reached via different paths, so to
+      avoid exploring the same state multiple times the search
+      routines employ cycle checking using hashing techniques. Hence,
+      each StateSpace state (or object) must be able to return an
+      immutable representation that uniquely represents the state and
+      can be used to index into a dictionary.
+
+      The StateSpace class must be specialized for the particular problem. Each
+      particular problem will define a subclass of StateSpace that will also
+      include information specific to that problem. See WaterJugs.py for an
+      example, and the Class implementation for more details.
+
+
+    B) class SearchEngine
+
+      objects of this class define the search routines. They utilize
+      two auxiliary classes (1) Class sNode---the objects of this class
+      are used to represent nodes in the search space (these nodes
+      contain problem states, i.e., StateSpace objects but they are
+      search nodes not states of the state space.  (2) Class
+      Open---these objects are used to store the set of unexpanded
+      nodes. These objects are search strategy specific. For example,
+      Open is implemented as a stack when doing depth-first search, as
+      a priority queue when doing astar search etc.
+
+      The main routines that the user will employ are in the SearchEngine class.
+      These include the ability to set the search strategy, and to invoke
+      search (using the search method). See the implementation for details. 
+
+      The solve method searches like search, but returns a SearchResult
+      object holding the solution path and the statistics of the search,
+      and only prints if a reporter is set (see set_reporter).
+
+    '''
+import heapq
+import itertools
+from array import array
+from collections import deque
+import multiprocessing
+import os
+import queue
+import shutil
+import tempfile
+import time
+
+
+class StateSpace:
+    '''Abstract class for defining State spaces for search routines'''
+    n = 0
+
+    #Set to True in a subclass if every action can be undone by an action
+    #of the same cost, so the predecessors of a state are its successors.
+    reversible = False
+    
+    def __init__(self, action, gval, parent):
+        '''Problem specific state space objects must always include the data items
+           a) self.action === the name of the action used to generate
+              this state from parent. If it is the initial state a good
+              convention is to supply the action name "START"
+           b) self.gval === a number (integer or real) that is the cost
+              of getting to this state.
+           c) parent the state from which this state was generated (by
+              applying "action"
+        '''
+        self.action = action
+        self.gval = gval
+        self.parent = parent
+        #index is only a label for printing. SearchEngine relabels the
+        #states it sees with its own counter, so searches don't share it.
+        self.index = StateSpace.n
+        StateSpace.n = StateSpace.n + 1
+
+    def successors(self):
+        '''This method when invoked on a state space object must return a
+           list of successor states, each with the data items "action"
+           the action used to generate this successor state, "gval" the
+           gval of self plus the cost of the action, and parent set to self.
+           Also any problem specific data must be specified property.'''
+        
+        print("Must be over ridden.")
+
+    def unpruned_successors(self):
+        '''successors() may skip moves that are redundant given how self
+           was generated (move pruning), which is fine for searching but
+           not when a particular successor is needed, e.g., to rebuild a
+           path. Problems that prune must over ride this to return every
+           successor. By default it is successors().'''
+        return self.successors()
+
+    def hashable_state(self):
+        '''This method must return an immutable and unique representation
+           of the state represented by self. The return value, e.g., a
+           string or tuple, will be used by hashing routines. So if obj1 and
+           obj2, both StateSpace objects then obj1.hashable_state() == obj2.hashable_state()
+           if and only if obj1 and obj2 represent the same problem state.'''
+
+        print("Must be over ridden.")
+
+    def predecessors(self):
+        '''This method is used by bidirectional search, which runs
+           backwards from the goal states. It must return a list of the
+           states from which self is reached by one action, each with
+           gval = the gval of self plus the cost of that action and parent
+           set to self. For reversible state spaces these are just the
+           successors.'''
+
+        if self.reversible:
+            return self.successors()
+        print("Must be over ridden.")
+
+    def goal_states(self):
+        '''This method is used by bidirectional search. It must return a
+           list (or any iterable) of all the goal states of the problem that
+           self belongs to, each with gval 0 and parent None. A generator
+           is best, as it is only drawn from as far as the search needs.'''
+
+        print("Must be over ridden.")
+
+    def zobrist_hash(self):
+        '''Return an integer hash of the state for SearchEngine.zobrist_on().
+           Problems can over ride this to return a 64-bit Zobrist hash that
+           each state derives incrementally from its parent's hash (XOR-ing
+           out the features the action removed and XOR-ing in the ones it
+           added) instead of building hashable_state() for every successor.
+           By default it is the hash of hashable_state().'''
+        return hash(self.hashable_state())
+
+    def infeasible(self):
+        '''Return None, or a string saying why no goal state of the problem
+           can be reached from self. SearchEngine.search calls this on the
+           initial state and, if it returns a reason, fails immediately
+           instead of exploring the whole reachable space to prove it.
+           Problems can over ride this with cheap structural checks; it
+           must never return a reason for a solvable problem. By default
+           nothing is known.'''
+        return None
+
+    def pack(self):
+        '''This method is used by SearchEngine.node_store_on(). It must
+           return a compact encoding of the state, ideally a non-negative
+           int below 2**64, from which unpack() rebuilds it.'''
+
+        print("Must be over ridden.")
+
+    def unpack(self, packed, action, gval, parent):
+        '''Return the state of the same problem as self encoded by packed
+           (see pack), with the given action, gval and parent.'''
+
+        print("Must be over ridden.")
+
+    def pack_key(self, packed):
+        '''This method is used for path checking by
+           SearchEngine.node_store_on(). Return a key of the state encoded
+           by packed that is equal for two states iff they have the same
+           hashable_state(). Over ride it if pack() also encodes something
+           else (e.g., how the state was reached). By default packed.'''
+        return packed
+
+    def state_bytes(self):
+        '''This method is used by external memory search. It must return
+           hashable_state() serialized to a bytes object of the same length
+           for every state of the problem.'''
+
+        print("Must be over ridden.")
+
+    def from_state_bytes(self, data, action, gval, parent):
+        '''Return the state of the same problem as self serialized as data
+           (see state_bytes), with the given action, gval and parent.'''
+
+        print("Must be over ridden.")
+
+    def print_state(self):
+        '''Print a representation of the state'''
+        print("Must be over ridden.")
+
+    def print_path(self):
+        '''print the sequence of actions used to reach self'''
+        #can be over ridden to print problem specific information
+        s = self
+        states = []
+        while s:
+            states.append(s)
+            s = s.parent
+        states.pop().print_state()
+        while states:
+            print(" ==> ", end="")
+            states.pop().print_state()
+        print("")
+ 
+    def has_path_cycle(self):
+        '''Returns true if self is equal to a prior state on its path'''
+        s = self.parent
+        hc = self.hashable_state()
+        while s:
+            if s.hashable_state() == hc:
+                return True
+            s = s.parent
+        return False
+
+#Constants to denote the search strategy. 
+_DEPTH_FIRST = 0
+_BREADTH_FIRST = 1
+_BEST_FIRST = 2
+_ASTAR = 3
+_IDASTAR = 4
+_BIDIRECTIONAL = 5
+_EXTERNAL_BREADTH_FIRST = 6
+_BREADTH_FIRST_HEURISTIC = 7
+_WEIGHTED_ASTAR = 8
+_ANYTIME_ASTAR = 9
+_PARALLEL_ASTAR = 10
+
+#The names of the search strategies, in the order of their constants
+STRATEGIES = ['depth_first', 'breadth_first', 'best_first', 'astar', 'idastar', 'bidirectional',
+              'external_breadth_first', 'breadth_first_heuristic', 'weighted_astar', 'anytime_astar',
+              'parallel_astar']
+
+#Cycle Checking. Either CC_NONE 'none' (no cycle checking), CC_PATH
+#'path' (path checking only) or CC_FULL 'full' (full cycle checking,
+#remembering all previously visited nodes).
+
+_CC_NONE = 0
+_CC_PATH = 1
+_CC_FULL = 2
+
+#Largest key for which best first and astar keep OPEN in an array of
+#buckets rather than in a priority queue.
+_MAX_BUCKET = 1 << 16
+
+#Number of expansions between two checks of the time and memory budgets
+_BUDGET_INTERVAL = 64
+
+def _current_memory():
+    '''Return the current resident memory of this process in bytes, or
+       None where it can't be measured (no /proc file system)'''
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE')
+
+#Number of expansions between two checks of its inbox by a parallel_astar
+#worker, and seconds between two termination probes of the workers
+_HDA_POLL = 16
+_HDA_PROBE = 0.01
+#Seconds a parallel_astar worker is given to stop before it is terminated
+_HDA_STOP = 1
+
+def _owner(key, workers):
+    '''Return the number of the parallel_astar worker that owns the states
+       with the cycle check key'''
+    return hash(key) % workers
+
+def _hda_worker(w, inboxes, master, root, goal_fn, heur_fn, zobrist, batch_size):
+    '''Worker w of parallel_astar (see SearchEngine.searchParallel). It
+       runs A* on the states it owns and sends the successors owned by
+       other workers to their inboxes, in batches of (packed state,
+       action, gval, cycle check key of the parent). Its own inbox brings
+       batches of states and control messages from the master.'''
+    workers = len(inboxes)
+    inbox = inboxes[w]
+    OPEN = []
+    #best maps the key of every state reached to (the smallest gval
+    #found, the key of the parent on that path)
+    best = dict()
+    outboxes = [[] for i in range(workers)]
+    count = itertools.count()
+    bound = None
+    sent = received = expanded = generated = pruned = 0
+
+    def add(state, key, parent_key):
+        nonlocal bound, pruned
+        entry = best.get(key)
+        if entry is not None and entry[0] <= state.gval:
+            pruned = pruned + 1
+            return
+        best[key] = (state.gval, parent_key)
+        if goal_fn(state):
+            if bound is None or state.gval < bound:
+                bound = state.gval
+                master.put(('goal', state.gval, key))
+            return
+        fval = state.gval + heur_fn(state)
+        if bound is None or fval < bound:
+            heapq.heappush(OPEN, (fval, -state.gval, next(count), key, state))
+
+    while True:
+        #idle when no state on OPEN can lead to a cheaper solution
+        idle = not OPEN or (bound is not None and OPEN[0][0] >= bound)
+        if idle:
+            for o in range(workers):
+                if outboxes[o]:
+                    inboxes[o].put(('states', outboxes[o]))
+                    sent = sent + 1
+                    outboxes[o] = []
+        try:
+            message = inbox.get() if idle else inbox.get_nowait()
+            while True:
+                if message[0] == 'states':
+                    received = received + 1
+                    for (packed, action, gval, parent_key) in message[1]:
+                        state = root.unpack(packed, action, gval, None)
+                        add(state, state.zobrist_hash() if zobrist else state.hashable_state(), parent_key)
+                elif message[0] == 'bound':
+                    if bound is None or message[1] < bound:
+                        bound = message[1]
+                elif message[0] == 'probe':
+                    idle = not OPEN or (bound is not None and OPEN[0][0] >= bound)
+                    master.put(('status', message[1], idle, sent, received))
+                elif message[0] == 'parent':
+                    if message[1] in best:
+                        master.put(('parent', message[1], best[message[1]][1]))
+                elif message[0] == 'stop':
+                    master.put(('stats', expanded, generated, pruned))
+                    return
+                message = inbox.get_nowait()
+        except queue.Empty:
+            pass
+
+        for i in range(_HDA_POLL):
+            if not OPEN or (bound is not None and OPEN[0][0] >= bound):
+                break
+            (fval, neg_gval, _, key, state) = heapq.heappop(OPEN)
+            if best[key][0] < state.gval:
+                continue
+            expanded = expanded + 1
+            for succ in state.successors():
+                generated = generated + 1
+                succ.parent = None
+                succ_key = succ.zobrist_hash() if zobrist else succ.hashable_state()
+                o = _owner(succ_key, workers)
+                if o == w:
+                    add(succ, succ_key, key)
+                    continue
+                outboxes[o].append((succ.pack(), succ.action, succ.gval, key))
+                if len(outboxes[o]) >= batch_size:
+                    inboxes[o].put(('states', outboxes[o]))
+                    sent = sent + 1
+                    outboxes[o] = []
+
+        #don't keep states from their owners, which may be idle
+        for o in range(workers):
+            if outboxes[o]:
+                inboxes[o].put(('states', outboxes[o]))
+                sent = sent + 1
+                outboxes[o] = []
+
+#Zero Heuristic Function---for uninformed search don't include heur_fn
+#in call to search engine's search method, defaults heur_fn to the zero fn.
+def _zero_hfn(state):
+    '''Null heuristic (zero)'''
+    return 0
+
+def weighted_heuristic(heur_fn, weight):
+    '''Return the heuristic weight*heur_fn, so that astar orders OPEN by
+       gval + weight*hval'''
+    if weight == 1:
+        return heur_fn
+    def weighted(state):
+        return weight * heur_fn(state)
+    return weighted
+
+class sNode:
+    '''Object of this class form the nodes of the search space.  Each
+    node consists of a search space object (determined by the problem
+    definition) along with the h and g values (the g values is
+    redundant as it is stored in the state, but we make a copy in the
+    node object for convenience), and a the number of the node (given
+    by the search engine that created it)'''
+    
+    def __init__(self, state, hval, index):
+        self.state = state
+        self.hval = hval
+        self.gval = state.gval
+        self.index = index
+
+class SearchResult:
+    '''The outcome of SearchEngine.solve. solved is True iff a goal state
+    was found (a SearchResult is true iff it is solved), state is the goal
+    state (None if not solved) and cost its gval. infeasible is the reason
+    given by the initial state if the problem was found infeasible without
+    searching, budget_exhausted the budget that stopped the search (see
+    SearchEngine.set_budget) and best_node the node of lowest hval expanded
+    (None for bidirectional, external_breadth_first,
+    breadth_first_heuristic and parallel_astar, which don't keep hvals).
+    nodes_expanded is the number of states expanded, nodes_generated the
+    number of search nodes created (the states generated that weren't
+    pruned, including the initial state), states_generated and
+    cycle_check_pruned are the counters of the engine, search_time the
+    wall clock time of the search in seconds (time.perf_counter) and
+    cpu_time its user cpu time (os.times).'''
+
+    def __init__(self, engine, state, infeasible, search_time, cpu_time):
+        self.solved = state is not None
+        self.state = state
+        self.cost = state.gval if state is not None else None
+        self.strategy = engine.get_strategy()
+        self.infeasible = infeasible
+        self.budget_exhausted = engine.budget_exhausted
+        self.best_node = engine.best_node
+        self.nodes_expanded = engine.expansions
+        self.nodes_generated = engine.node_count
+        self.states_generated = engine.states_generated
+        self.cycle_check_pruned = engine.cycle_check_pruned
+        self.search_time = search_time
+        self.cpu_time = cpu_time
+        self.iteration_stats = engine.iteration_stats
+        self.search_strategy = engine.strategy
+
+    def __bool__(self):
+        return self.solved
+
+    @property
+    def path(self):
+        '''The states from the initial state to the goal state'''
+        path = []
+        state = self.state
+        while state:
+            path.append(state)
+            state = state.parent
+        path.reverse()
+        return path
+
+    @property
+    def actions(self):
+        '''The actions from the initial state to the goal state'''
+        return [state.action for state in self.path[1:]]
+
+    def print_result(self):
+        '''Print the result as SearchEngine.search does (this is the
+           default reporter)'''
+        if self.solved:
+            print("Search Successful!")
+            print("   Strategy = '{}'".format(self.strategy))
+            if self.budget_exhausted:
+                print("   Budget exhausted: {}, best solution found so far".format(self.budget_exhausted))
+            print("   Solution cost = {}".format(self.cost))
+            print("   Goal state: ", end="")
+            self.state.print_state()
+            print("----------------------------")
+            print("Solution Path:")
+            self.state.print_path()
+        else:
+            if self.infeasible:
+                print("Search Failed! (strategy '{}') Infeasible: {}".format(self.strategy, self.infeasible))
+            elif self.budget_exhausted:
+                print("Search Stopped! (strategy '{}') Budget exhausted: {}".format(self.strategy, self.budget_exhausted))
+                if self.best_node:
+                    print("   Best state found (h = {}): ".format(self.best_node.hval), end="")
+                    self.best_node.state.print_state()
+            else:
+                print("Search Failed! (strategy '{}') No solution found".format(self.strategy))
+        print("----------------------------")
+        if self.search_strategy in (_IDASTAR, _BREADTH_FIRST_HEURISTIC, _ANYTIME_ASTAR):
+            _print_iterations(self.search_strategy, self.iteration_stats)
+        print("Search time = {}, nodes expanded = {}, states generated = {}, states cycle check pruned = {}".format(self.cpu_time, self.nodes_expanded, self.states_generated, self.cycle_check_pruned))
+
+def _print_iterations(strategy, iteration_stats):
+    '''Print the statistics of each IDA* (or breadth first heuristic
+       search) iteration, or of each anytime_astar solution'''
+    if strategy == _ANYTIME_ASTAR:
+        for i in range(len(iteration_stats)):
+            (weight, cost, bound, nodes, states) = iteration_stats[i]
+            print("ARA* solution {}: weight = {}, cost = {}, suboptimality bound = {:.3f}, nodes expanded = {}, states generated = {}".format(i + 1, weight, cost, bound, nodes, states))
+        return
+    name = "IDA*" if strategy == _IDASTAR else "BFHS"
+    for i in range(len(iteration_stats)):
+        (bound, nodes, states) = iteration_stats[i]
+        print("{} iteration {}: f-bound = {}, nodes expanded = {}, states generated = {}".format(name, i + 1, bound, nodes, states))
+
+class NodeStore:
+    '''A NodeStore holds the nodes of a search in parallel typed arrays
+       instead of as state objects linked to their parents. Node n has
+       parents[n] = the number of its parent node (-1 for the root),
+       actions[n] = the number of the action that generated it (see
+       action_names), gvals[n], hvals[n] and packed[n] = its state as
+       returned by StateSpace.pack(). States are only materialized (with
+       root.unpack()) to be expanded and to rebuild the solution path, so
+       a node costs tens of bytes instead of a whole state object.'''
+
+    def __init__(self, root):
+        self.root = root
+        self.parents = array('q')
+        self.actions = array('l')
+        #g and h values are kept as ints until one isn't, packed states
+        #as 64-bit ints until one isn't (then as a list)
+        self.gvals = array('q')
+        self.hvals = array('q')
+        self.packed = array('Q')
+        self.action_ids = dict()
+        self.action_names = []
+
+    def add(self, state, parent, hval):
+        '''Store a node for state, whose parent node is number parent, and
+           return its number'''
+        action = self.action_ids.get(state.action)
+        if action is None:
+            action = self.action_ids[state.action] = len(self.action_names)
+            self.action_names.append(state.action)
+        self.parents.append(parent)
+        self.actions.append(action)
+        try:
+            self.gvals.append(state.gval)
+        except TypeError:
+            self.gvals = array('d', self.gvals)
+            self.gvals.append(state.gval)
+        try:
+            self.hvals.append(hval)
+        except TypeError:
+            self.hvals = array('d', self.hvals)
+            self.hvals.append(hval)
+        packed = state.pack()
+        try:
+            self.packed.append(packed)
+        except (TypeError, OverflowError):
+            self.packed = list(self.packed)
+            self.packed.append(packed)
+        return len(self.parents) - 1
+
+    def __len__(self):
+        return len(self.parents)
+
+    def state(self, n, parent = None):
+        '''Materialize the state of node n, with the given parent'''
+        if n == 0:
+            return self.root
+        state = self.root.unpack(self.packed[n], self.action_names[self.actions[n]], self.gvals[n], parent)
+        state.index = n
+        return state
+
+    def path_keys(self, n):
+        '''Return the set of the pack_key of node n and of its ancestors,
+           without materializing any state'''
+        pack_key = self.root.pack_key
+        keys = set()
+        while n >= 0:
+            keys.add(pack_key(self.packed[n]))
+            n = self.parents[n]
+        return keys
+
+    def path(self, n):
+        '''Materialize the state of node n and all its ancestors, linked by
+           their parents, and return the state of node n'''
+        chain = []
+        while n >= 0:
+            chain.append(n)
+            n = self.parents[n]
+        state = None
+        while chain:
+            state = self.state(chain.pop(), state)
+        return state
+
+class Open:
+    '''Open objects hold the search frontier---the set of unexpanded
+       nodes. Depending on the search strategy used we want to extract
+       nodes from this set in different orders, so set up the object's
+       functions to operate as needed by the particular search
+       strategy'''
+    
+    def __init__(self, search_strategy, buckets = False):
+        self.strategy = search_strategy
+        self.buckets = False
+        #insert(node) adds a search node. push(item, gval, hval) adds any
+        #item (e.g., the number of a node in a NodeStore) with the keys of
+        #a node with that gval and hval, and extract returns the item.
+        if search_strategy == _DEPTH_FIRST:
+            #use stack for OPEN set (last in---most recent successor
+            #added---is first out)
+            self.open = []
+            self.insert = self.open.append
+            self.push = self.push_list
+            self.extract = self.open.pop
+        elif search_strategy == _BREADTH_FIRST:
+            #use queue for OPEN (first in---earliest node not yet
+            #expanded---is first out)
+            self.open = deque()
+            self.insert = self.open.append
+            self.push = self.push_list
+            self.extract = self.open.popleft
+        elif buckets:
+            #use an array of buckets indexed by the (integer) key, see below
+            self.open = []
+            self.buckets = True
+            self.minkey = 0
+            if search_strategy == _BEST_FIRST:
+                self.push = self.push_h_bucket
+                self.extract = self.extract_h_bucket
+            else:
+                self.push = self.push_f_bucket
+                self.extract = self.extract_f_bucket
+        elif search_strategy == _BEST_FIRST:
+            #use priority queue for OPEN (first out is node with
+            #lowest hval)
+            self.open = []
+            self.push = self.push_h
+            self.extract = self.extract_heap
+        elif search_strategy in (_ASTAR, _WEIGHTED_ASTAR):
+            #use priority queue for OPEN (first out is node with
+            #lowest fval = gval+hval)
+            self.open = []
+            self.push = self.push_f
+            self.extract = self.extract_heap
+        #ties between equal keys are broken in insertion order
+        self.count = itertools.count()
+
+    def insert(self, node):
+        self.push(node, node.gval, node.hval)
+
+    def push_list(self, item, gval, hval):
+        self.open.append(item)
+
+    #The priority queues hold tuples whose last item is the node, so that
+    #heapq compares the keys in front of it without calling back into
+    #python. We wish to break ties between nodes with identical f-values
+    #(h-values for best first) by expanding the node with the GREATER g
+    #value first, so the key is (f, -g) (or (h, -g)). This means that we
+    #expand nodes along deeper paths first causing the search to proceed
+    #directly to the goal.
+
+    def push_h(self, item, gval, hval):
+        heapq.heappush(self.open, (hval, -gval, next(self.count), item))
+
+    def push_f(self, item, gval, hval):
+        heapq.heappush(self.open, (gval + hval, -gval, next(self.count), item))
+
+    def extract_heap(self):
+        return heapq.heappop(self.open)[-1]
+
+    #When the keys are small non-negative integers (e.g., unit action costs
+    #and integer heuristics) the priority queue can instead be an array of
+    #buckets, making insert and extract O(1). For best first open[h] is a
+    #stack of the nodes with that hval. For astar open[f] is a dictionary
+    #mapping each gval to a (non-empty) stack of nodes, so within an
+    #f-bucket we expand the GREATEST gval first and the most recent node
+    #first. minkey is a lower bound on the smallest non-empty bucket. Empty
+    #buckets at the end of the array are trimmed, so OPEN is empty iff
+    #open == []. The first key that is not such an integer converts OPEN to
+    #a heap.
+
+    def push_h_bucket(self, item, gval, h):
+        if not isinstance(h, int) or h < 0 or h > _MAX_BUCKET:
+            self.to_heap()
+            self.push(item, gval, h)
+            return
+        buckets = self.open
+        while len(buckets) <= h:
+            buckets.append([])
+        buckets[h].append(item)
+        if h < self.minkey:
+            self.minkey = h
+
+    def extract_h_bucket(self):
+        buckets = self.open
+        h = self.minkey
+        while not buckets[h]:
+            h = h + 1
+        self.minkey = h
+        node = buckets[h].pop()
+        while buckets and not buckets[-1]:
+            buckets.pop()
+        return node
+
+    def push_f_bucket(self, item, g, hval):
+        f = g + hval
+        if not (isinstance(f, int) and isinstance(g, int)) or g < 0 or f < 0 or f > _MAX_BUCKET:
+            self.to_heap()
+            self.push(item, g, hval)
+            return
+        buckets = self.open
+        while len(buckets) <= f:
+            buckets.append({})
+        stacks = buckets[f]
+        if g in stacks:
+            stacks[g].append(item)
+        else:
+            stacks[g] = [item]
+        if f < self.minkey:
+            self.minkey = f
+
+    def extract_f_bucket(self):
+        buckets = self.open
+        f = self.minkey
+        while not buckets[f]:
+            f = f + 1
+        self.minkey = f
+        stacks = buckets[f]
+        g = max(stacks)
+        stack = stacks[g]
+        node = stack.pop()
+        if not stack:
+            del stacks[g]
+        while buckets and not buckets[-1]:
+            buckets.pop()
+        return node
+
+    def to_heap(self):
+        '''Move the items from the buckets to a priority queue. Their keys
+           are given by the buckets they are in.'''
+        if self.strategy == _BEST_FIRST:
+            entries = [(item, 0, h) for h in range(len(self.open)) for item in self.open[h]]
+            self.push = self.push_h
+        else:
+            entries = [(item, g, f - g) for f in range(len(self.open))
+                       for (g, stack) in self.open[f].items() for item in stack]
+            self.push = self.push_f
+        self.open = []
+        self.buckets = False
+        self.extract = self.extract_heap
+        for (item, gval, hval) in entries:
+            self.push(item, gval, hval)
+
+    def nodes(self):
+        '''Return the nodes on OPEN (in no particular order)'''
+        if self.buckets:
+            if self.strategy == _BEST_FIRST:
+                return [node for stack in self.open for node in stack]
+            return [node for stacks in self.open for stack in stacks.values() for node in stack]
+        if self.strategy in (_BEST_FIRST, _ASTAR, _WEIGHTED_ASTAR):
+            return [item[-1] for item in self.open]
+        return list(self.open)
+
+    def empty(self): return not self.open
+
+    def print_open(self):
+        print("{", end="")
+        nodes = self.nodes()
+        if len(nodes) == 1: 
+            print("   <S{}:{}:{}, g={}, h={}, f=g+h={}>".format(nodes[0].state.index, nodes[0].state.action, nodes[0].state.hashable_state(), nodes[0].gval, nodes[0].hval, nodes[0].gval+nodes[0].hval), end="")
+        else:
+            for nd in nodes:
+                print("   <S{}:{}:{}, g={}, h={}, f=g+h={}>".format(nd.state.index, nd.state.action, nd.state.hashable_state(), nd.gval, nd.hval, nd.gval+nd.hval), end="")
+        print("}")
+
+#Helpers of external memory search. Its files hold fixed width records
+#(serialized states) in sorted order, without duplicates.
+
+#Largest number of files merged at once
+_MAX_MERGE = 64
+
+def _read_records(filename, width, block = 4096):
+    '''Yield the records of width bytes of a file, reading block of them at
+       a time'''
+    with open(filename, 'rb') as f:
+        while True:
+            data = f.read(width * block)
+            if not data:
+                return
+            for i in range(0, len(data), width):
+                yield data[i:i + width]
+
+def _write_records(filename, records):
+    '''Write the records of a sorted iterable to a file, dropping
+       duplicates, and return the number written'''
+    count = 0
+    last = None
+    with open(filename, 'wb') as f:
+        for record in records:
+            if record != last:
+                f.write(record)
+                count = count + 1
+                last = record
+    return count
+
+def _difference(records, old):
+    '''Yield the records of the sorted iterable records that aren't in the
+       sorted iterable old'''
+    old = iter(old)
+    old_record = next(old, None)
+    for record in records:
+        while old_record is not None and old_record < record:
+            old_record = next(old, None)
+        if record != old_record:
+            yield record
+
+def _merge_files(filenames, width, directory, name):
+    '''Return the names of at most _MAX_MERGE files holding the records of
+       the sorted files filenames, merging (and deleting) them _MAX_MERGE
+       at a time as long as there are more'''
+    level = 0
+    while len(filenames) > _MAX_MERGE:
+        merged = []
+        for i in range(0, len(filenames), _MAX_MERGE):
+            group = filenames[i:i + _MAX_MERGE]
+            filename = os.path.join(directory, '{}_{}_{}.bin'.format(name, level, len(merged)))
+            _write_records(filename, heapq.merge(*[_read_records(f, width) for f in group]))
+            for f in group:
+                os.remove(f)
+            merged.append(filename)
+        filenames = merged
+        level = level + 1
+    return filenames
+
+def _file_contains(f, width, record):
+    '''Binary search for record in the open sorted file f'''
+    lo = 0
+    hi = os.fstat(f.fileno()).st_size // width
+    while lo < hi:
+        mid = (lo + hi) // 2
+        f.seek(mid * width)
+        item = f.read(width)
+        if item == record:
+            return True
+        if item < record:
+            lo = mid + 1
+        else:
+            hi = mid
+    return False
+
+class SearchEngine:
+    def __init__(self, strategy = 'depth_first', cc_level = 'default'):
+        self.set_strategy(strategy, cc_level)
+        self.trace = 0
+        self.zobrist = False
+        self.zobrist_verify = False
+        self.buckets = True
+        self.tt_size = 1 << 16
+        self.feasibility_check = True
+        self.node_store = False
+        self.upper_bound = None
+        self.set_weight()
+        self.solution_callback = None
+        self.quiet = False
+        self.reporter = None
+        self.set_workers()
+        self.set_budget()
+        self.set_external_memory()
+
+    def initStats(self):
+        self.node_count = 0
+        self.states_generated = 1    #initial state already generated on call so search
+        self.total_search_time = 0
+        self.cycle_check_pruned = 0
+        self.zobrist_collisions = 0
+        self.iteration_stats = []
+        self.expansions = 0
+        self.budget_used = 0
+        self.budget_exhausted = None
+        self.best_node = None
+        if self.max_seconds is not None:
+            self.deadline = time.monotonic() + self.max_seconds
+        self.total_search_time = os.times()[0]
+
+    def trace_on(self, level = 1):
+        '''For debugging, set tracking level 1 or 2'''
+        self.trace = level
+
+    def trace_off(self):
+        '''Turn off tracing'''
+        self.trace = 0
+
+    def quiet_on(self):
+        '''Don't print the result of search (and don't report the result
+           of solve, see set_reporter)'''
+        self.quiet = True
+        self.reporter = None
+
+    def quiet_off(self):
+        '''Print the result of search. This is the default.'''
+        self.quiet = False
+
+    def set_reporter(self, reporter = SearchResult.print_result):
+        '''Call reporter(result) with the SearchResult of every search
+           and solve. The default prints it; None (the initial setting)
+           reports nothing from solve and the result of search is printed
+           unless quiet.'''
+        self.reporter = reporter
+
+    def buckets_on(self):
+        '''For best first and astar keep OPEN in an array of buckets indexed
+           by hval (best first) or fval (astar) for as long as these are
+           small non-negative integers, then fall back to a priority queue.
+           This is the default.'''
+        self.buckets = True
+
+    def buckets_off(self):
+        '''For best first and astar always keep OPEN in a priority queue'''
+        self.buckets = False
+
+    def feasibility_check_on(self):
+        '''Before searching ask the initial state whether the problem is
+           infeasible (see StateSpace.infeasible) and if so fail at once.
+           This is the default.'''
+        self.feasibility_check = True
+
+    def feasibility_check_off(self):
+        '''Always search, even if the initial state reports that the
+           problem is infeasible'''
+        self.feasibility_check = False
+
+    def node_store_on(self):
+        '''For depth first, breadth first, best first and astar keep the
+           search nodes in a NodeStore: OPEN and the store only hold
+           numbers and packed states (see StateSpace.pack() and unpack()),
+           and states are rebuilt when they are expanded. This trades time
+           for a much smaller memory footprint per generated node.'''
+        self.node_store = True
+
+    def node_store_off(self):
+        '''Keep the search nodes as state objects. This is the default.'''
+        self.node_store = False
+
+    def set_external_memory(self, directory = None, run_size = 1 << 20, keep_files = False):
+        '''For external_breadth_first search, keep the layers in files in
+           directory (a new temporary directory if None), sort at most
+           run_size states in memory at a time, and if keep_files is True
+           don't delete the layer files when the search is over.'''
+        self.external_directory = directory
+        self.external_run_size = run_size
+        self.external_keep_files = keep_files
+
+    def set_upper_bound(self, bound = None):
+        '''For breadth_first_heuristic search, prune every node whose fval
+           exceeds bound, in a single iteration. Any bound no smaller than
+           the optimal solution cost gives an optimal solution, and the
+           tighter it is the less memory is used. If bound is None (the
+           default) the bound starts at the hval of the initial state and
+           is raised until a solution is found, as in IDA*.'''
+        self.upper_bound = bound
+
+    def set_weight(self, weight = 2, decrement = 0.5):
+        '''For weighted_astar order OPEN by gval + weight*hval. For
+           anytime_astar start with weight and lower it by decrement (but
+           not below 1) after each solution. weight must be at least 1 and
+           decrement positive.'''
+        if weight < 1 or decrement <= 0:
+            print('Invalid weight {} or decrement {}'.format(weight, decrement))
+            print('The weight must be at least 1 and the decrement positive')
+        else:
+            self.weight = weight
+            self.weight_decrement = decrement
+
+    def set_solution_callback(self, callback = None):
+        '''For anytime_astar call callback(goal state, bound) with each
+           improved solution as soon as it is found (see anytime_search)'''
+        self.solution_callback = callback
+
+    def set_budget(self, max_expansions = None, max_seconds = None, max_memory = None):
+        '''Stop the search as soon as it has expanded max_expansions
+           states, or has run for max_seconds seconds of wall clock time,
+           or the current resident memory of the process exceeds
+           max_memory bytes (a None budget, the default, is unlimited).
+           Expansions are checked on every expansion, time and memory every
+           _BUDGET_INTERVAL expansions, and the memory budget is ignored
+           where the resident memory can't be measured (see
+           _current_memory).
+
+           A stopped search fails (or, for anytime_astar, returns its best
+           solution so far) and self.budget_exhausted says which budget ran
+           out. As after any search, self.best_node is the node with the
+           smallest hval that was expanded.'''
+        self.max_expansions = max_expansions
+        self.max_seconds = max_seconds
+        self.max_memory = max_memory
+        self.budgeted = not (max_expansions is None and max_seconds is None and
+                             (max_memory is None or _current_memory() is None))
+
+    def budget_spent(self, state):
+        '''Count the expansion of state against the budget. Return True,
+           after setting self.budget_exhausted, if the search must stop
+           instead.'''
+        if self.max_expansions is not None and self.budget_used >= self.max_expansions:
+            self.budget_exhausted = '{} expansions'.format(self.max_expansions)
+        elif self.budget_used % _BUDGET_INTERVAL == 0:
+            if self.max_seconds is not None and time.monotonic() > self.deadline:
+                self.budget_exhausted = '{} seconds'.format(self.max_seconds)
+            elif self.max_memory is not None and (_current_memory() or 0) > self.max_memory:
+                self.budget_exhausted = '{} bytes of memory'.format(self.max_memory)
+        if self.budget_exhausted:
+            return True
+        self.budget_used = self.budget_used + 1
+        return False
+
+    def set_workers(self, workers = None, batch_size = 64):
+        '''For parallel_astar search, use workers processes (by default
+           one per cpu) and send states between them in batches of
+           batch_size'''
+        self.workers = workers
+        self.batch_size = batch_size
+
+    def set_transposition_table(self, size):
+        '''For idastar with full cycle checking, set the maximum number of
+           states remembered in the transposition table of an iteration'''
+        self.tt_size = size
+
+    def zobrist_on(self, verify = False):
+        '''Key full cycle checking on state.zobrist_hash() instead of
+           state.hashable_state(). With verify, the hashable state is
+           also stored for every key and compared on a hit, so that a hash
+           collision is counted and never causes a state to be pruned.'''
+        self.zobrist = True
+        self.zobrist_verify = verify
+
+    def zobrist_off(self):
+        '''Key full cycle checking on state.hashable_state()'''
+        self.zobrist = False
+        self.zobrist_verify = False
+
+    def cc_key(self, state):
+        '''Return the key of state in the cycle check dictionary'''
+        if self.zobrist:
+            return state.zobrist_hash()
+        return state.hashable_state()
+
+    def set_strategy(self, s, cc = 'default'):
+        if not s in STRATEGIES:
+            print('Unknown search strategy specified:', s)
+            print("Must be one of 'depth_first', 'breadth_first', 'best_first', 'astar', 'idastar', 'bidirectional', 'external_breadth_first', 'breadth_first_heuristic', 'weighted_astar', 'anytime_astar', or 'parallel_astar'")
+        elif not cc in ['default', 'none', 'path', 'full']:
+            print('Unknown cycle check level', cc)
+            print( "Must be one of ['default', 'none', 'path', 'full']")
+
+        else:
+            if cc == 'default' :
+                if s == 'depth_first' or s == 'idastar' :
+                    self.cycle_check = _CC_PATH
+                else:
+                    self.cycle_check = _CC_FULL
+            elif cc == 'none': self.cycle_check = _CC_NONE
+            elif cc == 'path': self.cycle_check = _CC_PATH
+            elif cc == 'full': self.cycle_check = _CC_FULL
+
+            if   s == 'depth_first'  : self.strategy = _DEPTH_FIRST
+            elif s == 'breadth_first': self.strategy = _BREADTH_FIRST
+            elif s == 'best_first'   : self.strategy = _BEST_FIRST
+            elif s == 'astar'        : self.strategy = _ASTAR
+            elif s == 'idastar'      : self.strategy = _IDASTAR
+            elif s == 'bidirectional': self.strategy = _BIDIRECTIONAL
+            elif s == 'external_breadth_first': self.strategy = _EXTERNAL_BREADTH_FIRST
+            elif s == 'breadth_first_heuristic': self.strategy = _BREADTH_FIRST_HEURISTIC
+            elif s == 'weighted_astar': self.strategy = _WEIGHTED_ASTAR
+            elif s == 'anytime_astar': self.strategy = _ANYTIME_ASTAR
+            elif s == 'parallel_astar': self.strategy = _PARALLEL_ASTAR
+
+    def new_node(self, state, hval):
+        '''Return a new search node numbered by this engine's node counter'''
+        node = sNode(state, hval, self.node_count)
+        self.node_count = self.node_count + 1
+        return node
+
+    def get_strategy(self):
+        if   self.strategy == _DEPTH_FIRST    : rval = 'depth_first'
+        elif self.strategy == _BREADTH_FIRST  : rval = 'breadth_first'
+        elif self.strategy == _BEST_FIRST     : rval = 'best_first' 
+        elif self.strategy == _ASTAR          : rval = 'astar'
+        elif self.strategy == _IDASTAR        : rval = 'idastar'
+        elif self.strategy == _BIDIRECTIONAL  : rval = 'bidirectional'
+        elif self.strategy == _EXTERNAL_BREADTH_FIRST: rval = 'external_breadth_first'
+        elif self.strategy == _BREADTH_FIRST_HEURISTIC: rval = 'breadth_first_heuristic'
+        elif self.strategy == _WEIGHTED_ASTAR: rval = 'weighted_astar (weight {})'.format(self.weight)
+        elif self.strategy == _ANYTIME_ASTAR: rval = 'anytime_astar (weight {} - {})'.format(self.weight, self.weight_decrement)
+        elif self.strategy == _PARALLEL_ASTAR: rval = 'parallel_astar ({} workers)'.format(self.workers or os.cpu_count() or 1)
+
+        rval = rval + ' with '
+
+        #bidirectional, external memory, anytime and parallel search always
+        #remember every state they reached
+        if self.strategy in (_BIDIRECTIONAL, _EXTERNAL_BREADTH_FIRST, _ANYTIME_ASTAR, _PARALLEL_ASTAR):
+            return rval + 'full cycle checking'
+        #breadth first heuristic search only remembers the last layers
+        if self.strategy == _BREADTH_FIRST_HEURISTIC:
+            return rval + 'layered duplicate detection'
+
+        if   self.cycle_check == _CC_NONE : rval = rval + 'no cycle checking'
+        elif self.cycle_check == _CC_PATH : rval = rval + 'path checking'
+        elif self.strategy == _IDASTAR   : rval = rval + 'path checking and a transposition table'
+        elif self.cycle_check == _CC_FULL : rval = rval + 'full cycle checking'
+
+        return rval
+
+    def search(self, initState, goal_fn, heur_fn = _zero_hfn):
+        '''Search from initState for a state satisfying goal_fn, report
+           the result (printing it unless quiet, see set_reporter) and
+           return the goal state, or False if none was found'''
+        result = self.solve(initState, goal_fn, heur_fn)
+        if self.reporter is None and not self.quiet:
+            result.print_result()
+        if result.solved:
+            return result.state
+        return False
+
+    def solve(self, initState, goal_fn, heur_fn = _zero_hfn):
+        '''Search from initState for a state satisfying goal_fn, pass the
+           result to the reporter, if one is set (see set_reporter), and
+           return it as a SearchResult'''
+        #Perform full cycle checking as follows
+        #a. check state before inserting into OPEN. If we had already reached
+        #   the same state via a cheaper path, don't insert into OPEN.
+        #b. Sometimes we find a new cheaper path to a state (after the older
+        #   more expensive path to the state has already been inserted.
+        #   We deal with this lazily. We check states extracted from OPEN
+        #   and if we have already expanded that state via a cheaper path
+        #   we don't expand it. If we had expanded the state via a more
+        #   expensive path, we re-expand it.
+     
+    ###INIT the Search
+        self.initStats()
+        start_time = time.perf_counter()
+
+        #BEGIN TRACING
+        if self.trace:
+            print("   TRACE: Search Strategy: ", self.get_strategy())
+            print("   TRACE: Initial State:", end="")
+            initState.print_state()
+        #END TRACING
+
+        initState.index = 0
+        reason = None
+        if self.feasibility_check:
+            reason = initState.infeasible()
+        if reason:
+            goal_node = False
+        elif self.strategy == _IDASTAR:
+            goal_node = self.searchIDA(initState, goal_fn, heur_fn)
+        elif self.strategy == _BIDIRECTIONAL:
+            goal_node = self.searchBidirectional(initState, goal_fn)
+        elif self.strategy == _EXTERNAL_BREADTH_FIRST:
+            goal_node = self.searchExternal(initState, goal_fn)
+        elif self.strategy == _BREADTH_FIRST_HEURISTIC:
+            goal_node = self.searchLayered(initState, goal_fn, heur_fn)
+        elif self.strategy == _ANYTIME_ASTAR:
+            goal_node = self.searchAnytime(initState, goal_fn, heur_fn)
+        elif self.strategy == _PARALLEL_ASTAR:
+            goal_node = self.searchParallel(initState, goal_fn, heur_fn)
+        elif self.strategy == _WEIGHTED_ASTAR and self.node_store:
+            goal_node = self.searchStore(initState, goal_fn, weighted_heuristic(heur_fn, self.weight))
+        elif self.strategy == _WEIGHTED_ASTAR:
+            goal_node = self.searchFrom(initState, goal_fn, weighted_heuristic(heur_fn, self.weight))
+        elif self.node_store:
+            goal_node = self.searchStore(initState, goal_fn, heur_fn)
+        else:
+            goal_node = self.searchFrom(initState, goal_fn, heur_fn)
+
+    ###NOW report the result
+        search_time = time.perf_counter() - start_time
+        self.total_search_time = os.times()[0] - self.total_search_time
+        result = SearchResult(self, goal_node.state if goal_node else None, reason, search_time, self.total_search_time)
+        if self.reporter:
+            self.reporter(result)
+        return result
+
+    def searchFrom(self, initState, goal_fn, heur_fn):
+        '''Set up OPEN (and the cycle check dictionary) with the initial
+           state and search'''
+        OPEN = Open(self.strategy, self.buckets)
+        
+        node = self.new_node(initState, heur_fn(initState))
+
+        #the cycle check dictionary stores the cheapest path (g-val) found
+        #so far to a state. 
+        if self.cycle_check == _CC_FULL:
+            self.cc_dictionary = dict() 
+            self.cc_dictionary[self.cc_key(initState)] = initState.gval
+            #with zobrist verification we also remember which state owns
+            #each key
+            if self.zobrist_verify:
+                self.cc_states = dict()
+                self.cc_states[self.cc_key(initState)] = initState.hashable_state()
+        OPEN.insert(node)
+
+        return self.searchOpen(OPEN, goal_fn, heur_fn)
+
+    def searchStore(self, initState, goal_fn, heur_fn):
+        '''searchFrom with the nodes kept in a NodeStore. OPEN holds node
+           numbers, a state is materialized from the store when its node is
+           extracted and the goal node's path is materialized when it is
+           found. Path checking compares the pack_key of each successor
+           with those of the packed ancestors of its parent.'''
+        store = NodeStore(initState)
+        OPEN = Open(self.strategy, self.buckets)
+        hval = heur_fn(initState)
+        OPEN.push(store.add(initState, -1, hval), initState.gval, hval)
+        self.node_count = self.node_count + 1
+        if self.cycle_check == _CC_FULL:
+            self.cc_dictionary = dict()
+            self.cc_dictionary[self.cc_key(initState)] = initState.gval
+            if self.zobrist_verify:
+                self.cc_states = dict()
+                self.cc_states[self.cc_key(initState)] = initState.hashable_state()
+
+        while not OPEN.empty():
+            n = OPEN.extract()
+            state = store.state(n)
+
+            #BEGIN TRACING
+            if self.trace:
+                print("   TRACE: Next State to expand: <S{}:{}:{}, g={}, h={}, f=g+h={}>".format(n, state.action, state.hashable_state(), state.gval, store.hvals[n], state.gval+store.hvals[n]))
+            #END TRACING
+
+            if goal_fn(state):
+                return sNode(store.path(n), store.hvals[n], n)
+
+            #as in searchOpen, skip states already expanded more cheaply
+            if self.cycle_check == _CC_FULL:
+                hash_state = self.cc_key(state)
+                if self.cc_dictionary[hash_state] < state.gval and not (
+                   self.zobrist_verify and
+                   self.cc_states[hash_state] != state.hashable_state()):
+                    continue
+
+            if self.best_node is None or store.hvals[n] < self.best_node.hval:
+                self.best_node = sNode(state, store.hvals[n], self.expansions)
+            if self.budgeted and self.budget_spent(state):
+                return False
+            self.expansions = self.expansions + 1
+
+            if self.cycle_check == _CC_PATH:
+                on_path = store.path_keys(n)
+            for succ in state.successors():
+                succ.index = self.states_generated
+                self.states_generated = self.states_generated + 1
+                hash_state = self.cc_key(succ)
+                if (self.cycle_check == _CC_FULL and self.zobrist_verify and
+                    hash_state in self.cc_dictionary and
+                    self.cc_states[hash_state] != succ.hashable_state()):
+                    self.zobrist_collisions = self.zobrist_collisions + 1
+                    del self.cc_dictionary[hash_state]
+                if (self.cycle_check == _CC_FULL and
+                    hash_state in self.cc_dictionary and
+                    succ.gval > self.cc_dictionary[hash_state]
+                   ) or (
+                    self.cycle_check == _CC_PATH and
+                    succ.pack_key(succ.pack()) in on_path):
+                    self.cycle_check_pruned = self.cycle_check_pruned + 1
+                    continue
+                hval = heur_fn(succ)
+                OPEN.push(store.add(succ, n, hval), succ.gval, hval)
+                self.node_count = self.node_count + 1
+                if self.cycle_check == _CC_FULL:
+                    self.cc_dictionary[hash_state] = succ.gval
+                    if self.zobrist_verify:
+                        self.cc_states[hash_state] = succ.hashable_state()
+
+        return False
+
+    def searchIDA(self, initState, goal_fn, heur_fn):
+        '''Iterative deepening A*: a sequence of depth first searches, each
+           one pruning the nodes whose fval exceeds its bound. The first
+           bound is the hval of the initial state, and every further bound
+           is the smallest fval that exceeded the previous one. Memory is
+           linear in the depth of the search.
+           
+           Cycle checking is done along the current path only, plus, under
+           full cycle checking, a transposition table of at most tt_size
+           states storing the smallest gval each state was expanded with
+           during the current iteration.
+
+           For each iteration (bound, nodes, states generated) is appended
+           to self.iteration_stats.'''
+
+        self.iteration_stats = []
+        bound = heur_fn(initState)
+        while True:
+            expansions = self.expansions
+            states_generated = self.states_generated
+            goal_node, next_bound = self.searchBounded(initState, goal_fn, heur_fn, bound)
+            self.iteration_stats.append((bound, self.expansions - expansions, self.states_generated - states_generated))
+
+            #BEGIN TRACING
+            if self.trace:
+                print("   TRACE: IDA* iteration with f-bound {} done, next f-bound = {}".format(bound, next_bound))
+            #END TRACING
+
+            if goal_node:
+                return goal_node
+            if next_bound is None or self.budget_exhausted:
+                #nothing was pruned by the bound, the whole space is explored
+                return False
+            bound = next_bound
+
+    def searchBounded(self, initState, goal_fn, heur_fn, bound):
+        '''One iteration of IDA*. Return (goal node, None) or, if no goal
+           is within bound, (False, the smallest fval above bound or None
+           if no node exceeded it).'''
+
+        next_bound = None
+        path_check = self.cycle_check != _CC_NONE
+        table = dict() if self.cycle_check == _CC_FULL else None
+
+        #The stack holds [node, iterator over its successors] for the nodes
+        #on the current path. The iterator is None until the node is
+        #expanded. on_path holds the cycle check keys of those nodes.
+        root = self.new_node(initState, heur_fn(initState))
+        stack = [[root, None]]
+        on_path = set()
+        if path_check:
+            on_path.add(self.cc_key(initState))
+        while stack:
+            entry = stack[-1]
+            node = entry[0]
+            if entry[1] is None:
+                fval = node.gval + node.hval
+                prune = fval > bound
+                if prune:
+                    if next_bound is None or fval < next_bound:
+                        next_bound = fval
+                elif goal_fn(node.state):
+                    return node, None
+                elif table is not None:
+                    key = self.cc_key(node.state)
+                    if key in table and table[key] <= node.gval:
+                        self.cycle_check_pruned = self.cycle_check_pruned + 1
+                        prune = True
+                    elif key in table or len(table) < self.tt_size:
+                        table[key] = node.gval
+                if prune:
+                    stack.pop()
+                    if path_check:
+                        on_path.discard(self.cc_key(node.state))
+                    continue
+
+                #BEGIN TRACING
+                if self.trace:
+                    print("   TRACE: Next State to expand: <S{}:{}:{}, g={}, h={}, f=g+h={}>".format(node.state.index, node.state.action, node.state.hashable_state(), node.gval, node.hval, node.gval+node.hval))
+                #END TRACING
+
+                if self.best_node is None or node.hval < self.best_node.hval:
+                    self.best_node = node
+                if self.budgeted and self.budget_spent(node.state):
+                    return False, None
+                self.expansions = self.expansions + 1
+
+                successors = node.state.successors()
+                for succ in successors:
+                    succ.index = self.states_generated
+                    self.states_generated = self.states_generated + 1
+                entry[1] = iter(successors)
+
+            succ = next(entry[1], None)
+            if succ is None:
+                stack.pop()
+                if path_check:
+                    on_path.discard(self.cc_key(node.state))
+                continue
+            if path_check:
+                key = self.cc_key(succ)
+                if key in on_path:
+                    self.cycle_check_pruned = self.cycle_check_pruned + 1
+                    continue
+                on_path.add(key)
+            stack.append([self.new_node(succ, heur_fn(succ)), None])
+
+        return False, next_bound
+
+    def searchBidirectional(self, initState, goal_fn):
+        '''Bidirectional breadth first search. One frontier grows forwards
+           from initState with successors(), the other backwards from
+           initState.goal_states() with predecessors(), always expanding a
+           whole layer of the smaller frontier. Every state reached on a
+           side is remembered, and when a layer reaches states of the other
+           side the cheapest of these meetings gives the solution. For
+           unit cost actions the solution is optimal. heur_fn is not used.
+
+           There may be far more goal states than states on the way to
+           them, so goal_states() is only drawn from while the backward
+           frontier could still be the smaller one: as long as it isn't
+           exhausted the forward side is expanded and its new states are
+           goal tested, and the backward side is only expanded once it
+           holds every goal state.
+
+           The path to the goal is rebuilt by replaying forwards the
+           backward half of the meeting path, so that the returned goal
+           state has the usual parent chain, actions and gvals.'''
+
+        if goal_fn(initState):
+            return self.new_node(initState, 0)
+
+        forward = dict()
+        forward[self.cc_key(initState)] = initState
+        backward = dict()
+        goals = iter(initState.goal_states())
+        #seeded is True once every goal state is in backward
+        seeded = False
+        forward_layer = [initState]
+        backward_layer = []
+
+        while forward_layer:
+            while not seeded and len(backward_layer) < len(forward_layer):
+                state = next(goals, None)
+                if state is None:
+                    seeded = True
+                    break
+                #there may be very many goal states, so each counts as an
+                #expansion against the budget
+                if self.budgeted and self.budget_spent(state):
+                    return False
+                key = self.cc_key(state)
+                if key not in backward:
+                    state.index = self.states_generated
+                    self.states_generated = self.states_generated + 1
+                    backward[key] = state
+                    backward_layer.append(state)
+            if seeded and not backward_layer:
+                break
+            if not seeded or len(forward_layer) <= len(backward_layer):
+                (layer, visited, other) = (forward_layer, forward, backward)
+            else:
+                (layer, visited, other) = (backward_layer, backward, forward)
+            new_layer = []
+            meeting = None
+            for state in layer:
+                if self.budgeted and self.budget_spent(state):
+                    return False
+                self.expansions = self.expansions + 1
+                if visited is forward:
+                    states = state.successors()
+                else:
+                    states = state.predecessors()
+                for succ in states:
+                    succ.index = self.states_generated
+                    self.states_generated = self.states_generated + 1
+                    key = self.cc_key(succ)
+                    if key in visited:
+                        self.cycle_check_pruned = self.cycle_check_pruned + 1
+                        continue
+                    visited[key] = succ
+                    new_layer.append(succ)
+                    self.node_count = self.node_count + 1
+                    if key in other:
+                        cost = succ.gval + other[key].gval
+                    elif not seeded and goal_fn(succ):
+                        #a goal state not drawn from goal_states() yet
+                        cost = succ.gval
+                    else:
+                        continue
+                    if meeting is None or cost < meeting[0]:
+                        meeting = (cost, succ, other.get(key))
+
+            #BEGIN TRACING
+            if self.trace:
+                print("   TRACE: {} layer of {} states expanded, {} new states".format("Forward" if visited is forward else "Backward", len(layer), len(new_layer)))
+            #END TRACING
+
+            if meeting:
+                (cost, state, match) = meeting
+                if match is None:
+                    return self.new_node(state, 0)
+                if visited is forward:
+                    return self.joinPaths(state, match)
+                return self.joinPaths(match, state)
+            if visited is forward:
+                forward_layer = new_layer
+            else:
+                backward_layer = new_layer
+
+        return False
+
+    def searchExternal(self, initState, goal_fn):
+        '''External memory breadth first search with delayed duplicate
+           detection, for state spaces too large for a closed list in
+           memory. Layer d (the states at distance d from initState) is a
+           file of their state_bytes() in sorted order. To build layer d+1
+           the states of layer d are read back and expanded, and the
+           serialized successors are sorted run_size at a time into run
+           files (see set_external_memory). The runs are then merged and
+           every state already in a previous layer is dropped by merging
+           against those layers too. For reversible state spaces these are
+           just the two previous layers (a successor of a state at distance
+           d is at distance d-1, d or d+1), otherwise all of them, which are
+           kept merged in one file of every state seen so far. Memory use is
+           bounded by run_size and the number of files merged at once,
+           independently of the size of the space.
+
+           Actions are assumed to have unit cost. The layers don't keep
+           parents, so when a goal is found its path is traced back through
+           the layer files and then replayed from initState, so that the
+           goal state has the usual parent chain, actions and gvals.'''
+
+        if goal_fn(initState):
+            return self.new_node(initState, 0)
+        width = len(initState.state_bytes())
+        directory = self.external_directory
+        if directory is None:
+            directory = tempfile.mkdtemp(prefix = 'search')
+        else:
+            os.makedirs(directory, exist_ok = True)
+        layers = [os.path.join(directory, 'layer_0.bin')]
+        _write_records(layers[0], [initState.state_bytes()])
+        #the states of every layer so far, for non reversible spaces
+        seen = layers[0]
+        try:
+            while True:
+                depth = len(layers) - 1
+                runs = []
+                records = []
+                goal = None
+                for record in _read_records(layers[depth], width):
+                    state = initState.from_state_bytes(record, None, depth, None)
+                    if self.budgeted and self.budget_spent(state):
+                        for run in runs:
+                            os.remove(run)
+                        return False
+                    self.expansions = self.expansions + 1
+                    for succ in state.successors():
+                        self.states_generated = self.states_generated + 1
+                        if goal_fn(succ):
+                            goal = succ
+                            break
+                        records.append(succ.state_bytes())
+                    if goal:
+                        break
+                    if len(records) >= self.external_run_size:
+                        runs.append(self.writeRun(directory, depth + 1, len(runs), records))
+                        records = []
+                if goal:
+                    for run in runs:
+                        os.remove(run)
+                    return self.new_node(self.externalPath(initState, goal, layers, width), 0)
+                if records:
+                    runs.append(self.writeRun(directory, depth + 1, len(runs), records))
+                runs = _merge_files(runs, width, directory, 'run_{}'.format(depth + 1))
+
+                if initState.reversible:
+                    previous = layers[-2:]
+                else:
+                    previous = [seen]
+                layers.append(os.path.join(directory, 'layer_{}.bin'.format(depth + 1)))
+                new = heapq.merge(*[_read_records(run, width) for run in runs])
+                old = heapq.merge(*[_read_records(layer, width) for layer in previous])
+                count = _write_records(layers[-1], _difference(new, old))
+                self.node_count = self.node_count + count
+                for run in runs:
+                    os.remove(run)
+                if not initState.reversible and count:
+                    merged = os.path.join(directory, 'seen_{}.bin'.format(depth + 1))
+                    _write_records(merged, heapq.merge(_read_records(seen, width), _read_records(layers[-1], width)))
+                    if seen != layers[0]:
+                        os.remove(seen)
+                    seen = merged
+
+                #BEGIN TRACING
+                if self.trace:
+                    print("   TRACE: Layer {}: {} states".format(depth + 1, count))
+                #END TRACING
+
+                if count == 0:
+                    return False
+        finally:
+            if seen != layers[0] and os.path.exists(seen):
+                os.remove(seen)
+            if not self.external_keep_files:
+                for layer in layers:
+                    if os.path.exists(layer):
+                        os.remove(layer)
+                if self.external_directory is None:
+                    shutil.rmtree(directory, ignore_errors = True)
+
+    def writeRun(self, directory, depth, number, records):
+        '''Sort records and write them to a new run file, return its name'''
+        records.sort()
+        filename = os.path.join(directory, 'run_{}_{}.bin'.format(depth, number))
+        _write_records(filename, records)
+        return filename
+
+    def externalPath(self, initState, goal, layers, width):
+        '''goal was generated from a state of the last layer. Trace its
+           path back to initState through the layer files, then replay it
+           forwards and return the goal state reached.'''
+        path = [goal.state_bytes(), goal.parent.state_bytes()]
+        state = goal.parent
+        for depth in range(len(layers) - 2, -1, -1):
+            with open(layers[depth], 'rb') as f:
+                if initState.reversible:
+                    #the predecessors of state in the previous layer are
+                    #among its successors
+                    for pred in state.unpruned_successors():
+                        if _file_contains(f, width, pred.state_bytes()):
+                            break
+                    state = pred
+                else:
+                    target = path[-1]
+                    for record in _read_records(layers[depth], width):
+                        pred = initState.from_state_bytes(record, None, depth, None)
+                        if any(succ.state_bytes() == target for succ in pred.unpruned_successors()):
+                            break
+                    state = pred
+            path.append(state.state_bytes())
+        #path runs from the goal back to a state serialized as initState
+        path.pop()
+        state = initState
+        while path:
+            record = path.pop()
+            next_state = None
+            for succ in state.unpruned_successors():
+                if succ.state_bytes() == record and (next_state is None or succ.gval < next_state.gval):
+                    next_state = succ
+            next_state.index = self.states_generated
+            self.states_generated = self.states_generated + 1
+            state = next_state
+        return state
+
+    def searchLayered(self, initState, goal_fn, heur_fn):
+        '''Breadth first heuristic search: breadth first search that prunes
+           every node whose fval exceeds an upper bound, and that doesn't
+           keep a closed list. For reversible state spaces only the layer
+           being expanded, the previous layer and the layer being
+           generated are in memory, and detecting duplicates against them
+           is enough to never expand a state twice (a successor of a state
+           at distance d is at distance d-1, d or d+1). Otherwise the cycle
+           check keys of all the previous layers are kept too. States don't
+           keep their parents.
+
+           The bound is self.upper_bound (see set_upper_bound) or, if that
+           is None, the hval of initState raised, iteration by iteration,
+           to the smallest fval that exceeded it (breadth first iterative
+           deepening A*). For unit cost actions and an admissible heur_fn
+           the solution is optimal.
+
+           The path is rebuilt by divide and conquer: every node beyond a
+           relay layer half way to the bound remembers its ancestor in that
+           layer, so when a goal is found its relay node splits the path in
+           two, and each half is found by a new search (see layeredPath).
+           The path is finally replayed from initState, so that the goal
+           state has the usual parent chain, actions and gvals.
+
+           For each iteration (bound, nodes, states generated) is appended
+           to self.iteration_stats.'''
+
+        self.iteration_stats = []
+        bound = self.upper_bound
+        if bound is None:
+            bound = heur_fn(initState)
+        while True:
+            expansions = self.expansions
+            states_generated = self.states_generated
+            keys, next_bound = self.layeredPath(initState, goal_fn, heur_fn, bound, None)
+            self.iteration_stats.append((bound, self.expansions - expansions, self.states_generated - states_generated))
+
+            #BEGIN TRACING
+            if self.trace:
+                print("   TRACE: BFHS iteration with f-bound {} done, next f-bound = {}".format(bound, next_bound))
+            #END TRACING
+
+            if keys:
+                break
+            if self.upper_bound is not None or next_bound is None or self.budget_exhausted:
+                return False
+            bound = next_bound
+        return self.new_node(self.replayPath(initState, keys[1:]), 0)
+
+    def replayPath(self, initState, keys):
+        '''Follow from initState the successors with the given cycle check
+           keys (the cheapest one at each step) and return the last state
+           reached'''
+        state = initState
+        for key in keys:
+            next_state = None
+            for succ in state.unpruned_successors():
+                if self.cc_key(succ) == key and (next_state is None or succ.gval < next_state.gval):
+                    next_state = succ
+            next_state.index = self.states_generated
+            self.states_generated = self.states_generated + 1
+            state = next_state
+        return state
+
+    def layeredPath(self, start, goal_fn, heur_fn, bound, depth):
+        '''Return (the cycle check keys of the states on a path from start
+           to a goal state, with no fval above bound, or None if there is
+           none, the smallest fval above bound or None). depth is the
+           length of the path if it is known.'''
+
+        if depth is None:
+            relay_depth = (bound - start.gval) // 2
+        else:
+            relay_depth = depth // 2
+        goal, relay, goal_depth, next_bound = self.layeredSearch(start, goal_fn, heur_fn, bound, depth, relay_depth)
+        if goal is None:
+            return None, next_bound
+        if goal_depth == 0:
+            return [self.cc_key(start)], next_bound
+        if goal_depth == 1:
+            return [self.cc_key(start), self.cc_key(goal)], next_bound
+        if relay is None or goal_depth <= relay_depth:
+            #the goal isn't beyond the relay layer, search again now that
+            #the length of the path is known
+            return self.relayedPath(start, goal_fn, heur_fn, bound, goal_depth), next_bound
+
+        #the relay node is on a path within bound at relay_depth from start
+        #and goal_depth - relay_depth from the goal
+        relay_key = self.cc_key(relay)
+        first = self.relayedPath(start, lambda state: self.cc_key(state) == relay_key, heur_fn, bound, relay_depth)
+        if first is None:
+            return None, next_bound
+        second = self.relayedPath(relay, goal_fn, heur_fn, bound, goal_depth - relay_depth)
+        if second is None:
+            return None, next_bound
+        return first + second[1:], next_bound
+
+    def relayedPath(self, start, goal_fn, heur_fn, bound, depth):
+        '''Return the keys of the path of length depth from start to a goal
+           state that an earlier search found, or None if the budget ran
+           out. Raise RuntimeError if the path is not found again.'''
+        keys = self.layeredPath(start, goal_fn, heur_fn, bound, depth)[0]
+        if keys is None and not self.budget_exhausted:
+            raise RuntimeError('breadth_first_heuristic lost a path of length {} within f-bound {}'.format(depth, bound))
+        return keys
+
+    def layeredSearch(self, start, goal_fn, heur_fn, bound, depth, relay_depth):
+        '''Breadth first search from start, pruning the nodes whose fval
+           exceeds bound, at most depth layers deep (unless depth is None).
+           Return (goal state or None, its ancestor in layer relay_depth or
+           None, the layer of the goal, the smallest fval above bound or
+           None).'''
+
+        next_bound = None
+        previous = set()
+        #a layer maps the cycle check key of each of its states to the
+        #state and its relay node
+        layer = {self.cc_key(start): (start, None)}
+        layer_depth = 0
+        while layer:
+            for (state, relay) in layer.values():
+                if goal_fn(state):
+                    return state, relay, layer_depth, next_bound
+            if layer_depth == depth:
+                break
+            new_layer = dict()
+            for (state, relay) in layer.values():
+                if self.budgeted and self.budget_spent(state):
+                    return None, None, layer_depth, None
+                self.expansions = self.expansions + 1
+                #start may be a relay node, whose successors must not be
+                #pruned by the move that generated it in an earlier search
+                successors = state.unpruned_successors() if layer_depth == 0 else state.successors()
+                for succ in successors:
+                    self.states_generated = self.states_generated + 1
+                    fval = succ.gval + heur_fn(succ)
+                    if fval > bound:
+                        if next_bound is None or fval < next_bound:
+                            next_bound = fval
+                        continue
+                    key = self.cc_key(succ)
+                    if key in new_layer or key in layer or key in previous:
+                        self.cycle_check_pruned = self.cycle_check_pruned + 1
+                        continue
+                    #drop the parent so that expanded layers can be freed
+                    succ.parent = None
+                    self.node_count = self.node_count + 1
+                    if layer_depth + 1 == relay_depth:
+                        new_layer[key] = (succ, succ)
+                    else:
+                        new_layer[key] = (succ, relay)
+
+            #BEGIN TRACING
+            if self.trace:
+                print("   TRACE: Layer {}: {} states within f-bound {}".format(layer_depth + 1, len(new_layer), bound))
+            #END TRACING
+
+            if start.reversible:
+                previous = layer
+            else:
+                previous.update(layer)
+            layer = new_layer
+            layer_depth = layer_depth + 1
+        return None, None, layer_depth, next_bound
+
+    def searchParallel(self, initState, goal_fn, heur_fn):
+        '''Hash distributed A* (HDA*). Each of the worker processes (see
+           set_workers) owns the states whose cycle check key hashes to it
+           and runs A* on them with its own OPEN and its own table of the
+           cheapest gval found for each state. The successors owned by
+           other workers are sent to them in batches (of batch_size
+           states, or fewer at the end of each round of expansions),
+           packed with StateSpace.pack(). A worker that finds a goal state
+           reports its cost to the master (this process), which
+           broadcasts it as a bound: no worker expands a state whose fval
+           isn't below it.
+
+           The search ends when every worker is idle (no state on its OPEN
+           has an fval below the bound) and no batch is in transit: the
+           master sends probes until two consecutive waves find every
+           worker idle with the same counts of batches sent and received,
+           and as many received as sent. For an admissible heur_fn the
+           cheapest goal found is then optimal. Its path is rebuilt by
+           asking the owners for the key of the parent of each state, and
+           replayed from initState.
+
+           The workers are forked, or spawned with pickled copies of
+           initState, goal_fn and heur_fn. Keys are assigned to workers by
+           hash(), so where workers are spawned the keys should hash the
+           same in every process (e.g., use zobrist_on()). Only the time
+           budget (see set_budget) applies.'''
+
+        if goal_fn(initState):
+            return self.new_node(initState, 0)
+        workers = self.workers or os.cpu_count() or 1
+        inboxes = [multiprocessing.Queue() for w in range(workers)]
+        master = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target = _hda_worker, daemon = True,
+                                             args = (w, inboxes, master, initState, goal_fn, heur_fn, self.zobrist, self.batch_size))
+                     for w in range(workers)]
+        stopping = False
+        try:
+            for process in processes:
+                process.start()
+            initial = (initState.pack(), initState.action, initState.gval, None)
+            inboxes[_owner(self.cc_key(initState), workers)].put(('states', [initial]))
+            cost = None
+            goal_key = None
+            previous = None
+            wave = 0
+            while True:
+                wave = wave + 1
+                for inbox in inboxes:
+                    inbox.put(('probe', wave))
+                #the initial batch was sent by the master
+                (idle, sent, received) = (True, 1, 0)
+                statuses = 0
+                while statuses < workers:
+                    message = self.parallelMessage(master, processes)
+                    if message is None:
+                        return False
+                    if message[0] == 'goal' and (cost is None or message[1] < cost):
+                        (cost, goal_key) = (message[1], message[2])
+                        for inbox in inboxes:
+                            inbox.put(('bound', cost))
+                    elif message[0] == 'status' and message[1] == wave:
+                        statuses = statuses + 1
+                        idle = idle and message[2]
+                        sent = sent + message[3]
+                        received = received + message[4]
+                if idle and sent == received and (idle, sent, received) == previous:
+                    break
+                previous = (idle, sent, received)
+
+                #BEGIN TRACING
+                if self.trace:
+                    print("   TRACE: Probe {}: {} workers, {} idle, {} batches sent, {} received, best cost {}".format(wave, workers, "all" if idle else "not all", sent, received, cost))
+                #END TRACING
+
+                if not idle:
+                    time.sleep(_HDA_PROBE)
+
+            keys = []
+            key = goal_key
+            while key is not None:
+                keys.append(key)
+                for inbox in inboxes:
+                    inbox.put(('parent', key))
+                message = self.parallelMessage(master, processes)
+                while message is not None and not (message[0] == 'parent' and message[1] == key):
+                    message = self.parallelMessage(master, processes)
+                if message is None:
+                    return False
+                key = message[2]
+
+            stopping = True
+            for inbox in inboxes:
+                inbox.put(('stop',))
+            stopped = 0
+            while stopped < workers:
+                message = self.parallelMessage(master, processes)
+                if message is None:
+                    return False
+                if message[0] == 'stats':
+                    stopped = stopped + 1
+                    self.expansions = self.expansions + message[1]
+                    #every state generated reaches its owner's table
+                    self.node_count = self.node_count + message[2] - message[3]
+                    self.states_generated = self.states_generated + message[2]
+                    self.cycle_check_pruned = self.cycle_check_pruned + message[3]
+        finally:
+            #however the search ended (solved, out of budget or by an
+            #exception such as KeyboardInterrupt), ask the workers to stop
+            #and terminate those that don't within _HDA_STOP seconds
+            if not stopping:
+                for inbox in inboxes:
+                    inbox.put(('stop',))
+            deadline = time.monotonic() + _HDA_STOP
+            for process in processes:
+                if process.pid is not None:
+                    process.join(max(0, deadline - time.monotonic()))
+                    if process.is_alive():
+                        process.terminate()
+                        process.join()
+
+        if cost is None:
+            return False
+        #keys runs from the goal back to initState
+        keys.pop()
+        keys.reverse()
+        return self.new_node(self.replayPath(initState, keys), 0)
+
+    def parallelMessage(self, master, processes):
+        '''Return the next message to the master of parallel_astar, or None
+           if the time budget ran out first'''
+        while True:
+            #checked before every message, as the probes keep them coming
+            if self.max_seconds is not None and time.monotonic() > self.deadline:
+                self.budget_exhausted = '{} seconds'.format(self.max_seconds)
+                return None
+            try:
+                return master.get(timeout = _HDA_PROBE)
+            except queue.Empty:
+                pass
+            for process in processes:
+                if process.exitcode not in (None, 0):
+                    raise RuntimeError('parallel_astar worker died with exit code {}'.format(process.exitcode))
+
+    def searchAnytime(self, initState, goal_fn, heur_fn):
+        '''Run anytime_search to the end, passing each solution to the
+           solution callback, and return the node of the last one'''
+        goal_node = False
+        for (state, bound) in self.anytimeSolutions(initState, goal_fn, heur_fn):
+            if self.solution_callback:
+                self.solution_callback(state, bound)
+            goal_node = sNode(state, 0, self.node_count)
+        return goal_node
+
+    def anytime_search(self, initState, goal_fn, heur_fn = _zero_hfn):
+        '''Anytime repairing A* (ARA*). A generator that yields (goal
+           state, bound) for every improved solution, where bound is an
+           upper bound on the ratio of the cost of the solution to the
+           optimal cost (for an admissible heur_fn). The first solution is
+           found by a weighted A* search with the weight of set_weight.
+           After each search the weight is lowered by the decrement and the
+           search resumes, until it has been done with weight 1 (then the
+           last solution is optimal and its bound is 1) or OPEN holds no
+           state that could lead to a cheaper solution.
+
+           The searches share their work: every state keeps the cheapest
+           path found to it, a search expands each state at most once and
+           a state reached more cheaply after it was expanded waits on an
+           INCONS list that is moved to OPEN for the next search. States
+           that can't lead to a solution cheaper than the current one (by
+           heur_fn) are dropped. Cycle checking is always full.
+
+           For each solution (weight, cost, bound, nodes expanded, states
+           generated so far) is appended to self.iteration_stats. The
+           statistics and budgets are reset when the generator starts.'''
+        self.initStats()
+        initState.index = 0
+        yield from self.anytimeSolutions(initState, goal_fn, heur_fn)
+
+    def anytimeSolutions(self, initState, goal_fn, heur_fn):
+        '''The generator of anytime_search, without resetting the
+           statistics'''
+        weight = self.weight
+        count = itertools.count()
+        #best maps the cycle check key of every state reached to the state
+        #with the cheapest path found to it, hvals to its hval
+        key = self.cc_key(initState)
+        best = {key: initState}
+        hvals = {key: heur_fn(initState)}
+        OPEN = [(weight * hvals[key], -initState.gval, next(count), key, initState)]
+        on_open = {key}
+        closed = set()
+        incons = set()
+        solution = None
+        last_solution = None
+        last_bound = None
+        stopped = False
+
+        while True:
+            #weighted A* with the current weight, until no state on OPEN
+            #has a smaller key than the cost of the solution
+            while OPEN:
+                (fval, neg_gval, _, key, state) = OPEN[0]
+                if solution is not None and fval >= solution.gval:
+                    break
+                heapq.heappop(OPEN)
+                if best[key] is not state or key in closed:
+                    #a cheaper path to the state was found after this entry
+                    continue
+                on_open.discard(key)
+
+                #BEGIN TRACING
+                if self.trace:
+                    print("   TRACE: Next State to expand: <S{}:{}:{}, g={}, h={}, f=g+w*h={}>".format(state.index, state.action, state.hashable_state(), state.gval, hvals[key], fval))
+                #END TRACING
+
+                if goal_fn(state):
+                    if solution is None or state.gval < solution.gval:
+                        solution = state
+                    continue
+                if self.best_node is None or hvals[key] < self.best_node.hval:
+                    self.best_node = sNode(state, hvals[key], self.expansions)
+                if self.budgeted and self.budget_spent(state):
+                    #stop with the solution found so far
+                    on_open.add(key)
+                    stopped = True
+                    break
+                closed.add(key)
+                self.expansions = self.expansions + 1
+                for succ in state.successors():
+                    succ.index = self.states_generated
+                    self.states_generated = self.states_generated + 1
+                    key = self.cc_key(succ)
+                    if key in best and best[key].gval <= succ.gval:
+                        self.cycle_check_pruned = self.cycle_check_pruned + 1
+                        continue
+                    hval = hvals.get(key)
+                    if hval is None:
+                        hval = hvals[key] = heur_fn(succ)
+                    if solution is not None and succ.gval + hval >= solution.gval:
+                        continue
+                    best[key] = succ
+                    self.node_count = self.node_count + 1
+                    if key in closed:
+                        incons.add(key)
+                    else:
+                        on_open.add(key)
+                        heapq.heappush(OPEN, (succ.gval + weight * hval, -succ.gval, next(count), key, succ))
+
+            if solution is None:
+                #OPEN is empty (or the budget is exhausted), there is no
+                #solution
+                return
+
+            #the cheapest path to a goal passes through a state on OPEN or
+            #INCONS, so the smallest fval there bounds the optimal cost
+            pending = on_open | incons
+            lower = min([best[key].gval + hvals[key] for key in pending if best[key].gval + hvals[key] < solution.gval], default = None)
+            if lower is None or (weight == 1 and not stopped):
+                bound = 1
+            elif stopped:
+                #the weight only bounds the solution of a finished search,
+                #but an earlier bound still holds for a cheaper solution
+                bound = last_bound if last_bound is not None else float('inf')
+                if lower > 0:
+                    bound = min(bound, solution.gval / lower)
+            elif lower > 0:
+                bound = min(weight, solution.gval / lower)
+            else:
+                bound = weight
+            if solution is not last_solution or bound < last_bound:
+                self.iteration_stats.append((weight, solution.gval, bound, self.expansions, self.states_generated))
+
+                #BEGIN TRACING
+                if self.trace:
+                    print("   TRACE: ARA* solution with weight {}: cost {}, suboptimality bound {}".format(weight, solution.gval, bound))
+                #END TRACING
+
+                yield (solution, bound)
+                last_solution = solution
+                last_bound = bound
+            if bound <= 1 or stopped:
+                return
+
+            weight = max(1, weight - self.weight_decrement)
+            on_open = pending
+            incons = set()
+            closed = set()
+            OPEN = [(best[key].gval + weight * hvals[key], -best[key].gval, next(count), key, best[key]) for key in on_open]
+            heapq.heapify(OPEN)
+
+    def joinPaths(self, state, backward_state):
+        '''state was reached forwards and backward_state, the same state,
+           backwards from a goal. Follow the actions of the backward path
+           from state and return the node of the goal state reached.'''
+        backward_state = backward_state.parent
+        while backward_state:
+            key = self.cc_key(backward_state)
+            next_state = None
+            for succ in state.unpruned_successors():
+                if self.cc_key(succ) == key and (next_state is None or succ.gval < next_state.gval):
+                    next_state = succ
+            next_state.index = self.states_generated
+            self.states_generated = self.states_generated + 1
+            state = next_state
+            backward_state = backward_state.parent
+        return self.new_node(state, 0)
+
+    def print_iterations(self):
+        '''Print the statistics of each IDA* (or breadth first heuristic
+           search) iteration, or of each anytime_astar solution'''
+        _print_iterations(self.strategy, self.iteration_stats)
+
+    def searchOpen(self, OPEN, goal_fn, heur_fn):
+        '''Open has some nodes on it, now search from that state of OPEN'''
+
+        #BEGIN TRACING
+        if self.trace:
+            print("   TRACE: Initial OPEN: ", OPEN.print_open())
+            if self.cycle_check == _CC_FULL:
+                print("   TRACE: Initial CC_Dict:", self.cc_dictionary)
+        #END TRACING
+
+        while not OPEN.empty():
+            node = OPEN.extract()
+
+            #BEGIN TRACING
+            if self.trace:
+                print("   TRACE: Next State to expand: <S{}:{}:{}, g={}, h={}, f=g+h={}>".format(node.state.index, node.state.action, node.state.hashable_state(), node.gval, node.hval, node.gval+node.hval))
+                if node.state.gval != node.gval:
+                    print("ERROR: Node gval not equal to state gval!")
+            #END TRACING
+                        
+            if goal_fn(node.state):
+                #node at front of OPEN is a goal...search is completed.
+                return node
+
+             #All states reached by a search node on OPEN have already
+             #been hashed into the self.cc_dictionary. However,
+             #before expanding a node we might have already expanded
+             #an equivalent state with lower g-value. So only expand
+             #the node if the hashed g-value is no greater than the
+             #node's current g-value. 
+
+            #BEGIN TRACING
+            if self.trace:
+                if self.cycle_check == _CC_FULL: print("   TRACE: CC_dict gval={}, node.gval={}".format(self.cc_dictionary[self.cc_key(node.state)], node.gval))
+            #END TRACING
+
+            if self.cycle_check == _CC_FULL:
+                hash_state = self.cc_key(node.state)
+                #on a zobrist collision the entry may belong to another
+                #state, so it says nothing about this one
+                if self.cc_dictionary[hash_state] < node.gval and not (
+                   self.zobrist_verify and
+                   self.cc_states[hash_state] != node.state.hashable_state()):
+                    continue
+
+            if self.best_node is None or node.hval < self.best_node.hval:
+                self.best_node = node
+            if self.budgeted and self.budget_spent(node.state):
+                return False
+            self.expansions = self.expansions + 1
+
+            successors = node.state.successors()
+            for succ in successors:
+                succ.index = self.states_generated
+                self.states_generated = self.states_generated + 1
+
+            #BEGIN TRACING
+            if self.trace:
+                print("   TRACE: Expanding Node. Successors = {", end="")
+                for ss in successors:
+                    print("<S{}:{}:{}, g={}, h={}, f=g+h={}>, ".format(ss.index, ss.action, ss.hashable_state(), ss.gval, heur_fn(ss), ss.gval+heur_fn(ss)), end="")
+                print("}")
+            #END TRACING
+
+            for succ in successors:
+                hash_state = self.cc_key(succ)
+
+                if (self.cycle_check == _CC_FULL and self.zobrist_verify and
+                    hash_state in self.cc_dictionary and
+                    self.cc_states[hash_state] != succ.hashable_state()):
+                    #zobrist collision: don't prune, the new state takes
+                    #over the key
+                    self.zobrist_collisions = self.zobrist_collisions + 1
+                    del self.cc_dictionary[hash_state]
+
+                #BEGIN TRACING
+                if self.trace > 1:
+                    print("   TRACE: Successor State:", end="")
+                    print("<S{}:{}:{}, g={}, h={}, f=g+h={}>, ".format(succ.index, ss.action, succ.hashable_state(), succ.gval, heur_fn(succ), succ.gval+heur_fn(succ)), end="")
+                    if self.cycle_check == _CC_FULL and hash_state in self.cc_dictionary:
+                        print("   TRACE: Already in CC_dict, CC_dict gval={}, successor state gval={}".format(self.cc_dictionary[hash_state], succ.gval))
+                    if self.cycle_check == _CC_PATH and succ.has_path_cycle():
+                        print("   TRACE: On cyclic path")
+                #END TRACING
+
+                prune_succ = (self.cycle_check == _CC_FULL and
+                              hash_state in self.cc_dictionary and
+                              succ.gval > self.cc_dictionary[hash_state]
+                             ) or (
+                              self.cycle_check == _CC_PATH and
+                              succ.has_path_cycle()
+                             )
+
+                if prune_succ :
+                    self.cycle_check_pruned = self.cycle_check_pruned + 1
+                    #BEGIN TRACING
+                    if self.trace > 1:
+                        print(" TRACE: Successor State pruned by cycle checking")
+                    #END TRACING
+                    continue
+
+                #passed all cycle checks...add to open
+                OPEN.insert(self.new_node(succ, heur_fn(succ)))
+                #BEGIN TRACING
+                if self.trace > 1:
+                    print(" TRACE: Successor State added to OPEN")
+                #END TRACING
+
+                #record cost of this path in dictionary.
+                if self.cycle_check == _CC_FULL:
+                    self.cc_dictionary[hash_state] = succ.gval
+                    if self.zobrist_verify:
+                        self.cc_states[hash_state] = succ.hashable_state()
+
+        #end of while--OPEN is empty and no solution
+        return False
+            